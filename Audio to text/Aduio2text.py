@@ -1,64 +1,166 @@
-import whisper
 import os
+import subprocess
+import tempfile
 import numpy as np
 from pydub import AudioSegment
-import tempfile
+from collections import OrderedDict
+import transcript_cache
+import long_audio
+import model_registry
+
+SAMPLE_RATE = 16000
+PIPE_CHUNK_SIZE = 1024 * 1024
+
+# numpy dtype for each pydub sample width (pydub widens 24-bit to 32-bit)
+SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
 
 
 class WhisperTranscriber:
     """
     Audio to text converter using OpenAI's Whisper model.
     """
+
+    # Decoded audio arrays are large, so only a few are kept
+    DECODED_CACHE_SIZE = 4
+    RESULT_CACHE_SIZE = 32
     
-    def __init__(self, model_size: str = "base"):
+    def __init__(
+        self,
+        model_size: str = "base",
+        cache="default",
+        device: str = None,
+        backend: str = None,
+        threads: int = None,
+        memoize: bool = True
+    ):
         """
-        Initialize the Whisper model.
+        Initialize the Whisper model. The weights come from the process-wide
+        model registry, so transcribers of the same size share one copy.
+        cache: transcript cache to use; "default" builds one from the
+        environment, None disables caching.
+        backend: "torch" (default), "torch-int8" or "ctranslate2", see
+        model_registry.BACKENDS. Defaults to $WHISPER_BACKEND.
+        threads: intra-op CPU threads for inference. Defaults to
+        $WHISPER_CPU_THREADS, else the library default.
+        memoize: keep recent decoded audio and results per instance. Turn
+        off when every file is seen once (batch runs); it only costs RSS.
         """
-        print(f"Loading Whisper model: {model_size}")
-        self.model = whisper.load_model(model_size)
+        self.model_size = model_size
+        self.backend = backend or os.getenv("WHISPER_BACKEND", "torch")
+        self.device = device
+
+        threads = threads or int(os.getenv("WHISPER_CPU_THREADS", "0"))
+        self.threads = threads
+        if threads and self.backend != "ctranslate2":
+            # Process-wide for torch; CTranslate2 takes it at load time below
+            import torch
+
+            torch.set_num_threads(threads)
+
+        if cache == "default":
+            cache = transcript_cache.create_transcript_cache()
+        self.cache = cache
+        self._decoded = OrderedDict()
+        self._results = OrderedDict()
+        self._decoded_cache_size = self.DECODED_CACHE_SIZE if memoize else 0
+        self._result_cache_size = self.RESULT_CACHE_SIZE if memoize else 0
+
+        print(f"Loading Whisper model: {model_size} ({self.backend})")
+        self.model = model_registry.get_model(model_size, device, self.backend, threads)
+        self._model_lock = model_registry.get_lock(model_size, device, self.backend)
         print("Model loaded successfully!")
     
-    def _preprocess_audio(self, audio_path: str) -> str:
+    def _decode_with_ffmpeg(self, audio_path: str) -> np.ndarray:
         """
-        Convert audio to proper WAV format that Whisper can handle.
-        Returns path to processed audio file.
+        Stream ffmpeg's mono 16 kHz float32 output straight into a NumPy
+        buffer. No temp file, and no int-to-float scaling to get wrong.
         """
-        print(f"Pre-processing audio: {audio_path}")
-        
-        # Load audio with pydub
-        audio = AudioSegment.from_file(audio_path)
-        
-        # Convert to mono, 16kHz, 16-bit (Whisper's required format)
-        audio = audio.set_channels(1)
-        audio = audio.set_frame_rate(16000)
-        audio = audio.set_sample_width(2)  # 16-bit
-        
-        # Save to temporary file
-        temp_path = os.path.join(tempfile.gettempdir(), "whisper_temp.wav")
-        audio.export(temp_path, format="wav")
-        
-        print(f"Audio preprocessed: {temp_path}")
-        return temp_path
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error", "-threads", "0",
+            "-i", audio_path,
+            "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "-",
+        ]
+        buffer = bytearray()
+        # stderr goes to a file, not a second pipe: if ffmpeg filled that pipe
+        # while we block reading stdout, both sides would wait forever
+        with tempfile.TemporaryFile() as errors:
+            with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors) as proc:
+                while True:
+                    chunk = proc.stdout.read(PIPE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    buffer += chunk
+            errors.seek(0)
+            stderr = errors.read()
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='ignore').strip()}")
+
+        # bytearray keeps the array writable, which torch.from_numpy expects
+        return np.frombuffer(buffer, dtype=np.float32)
     
     def _load_audio_as_numpy(self, audio_path: str) -> np.ndarray:
         """
-        Load audio file and convert to numpy array.
+        Load audio file with pydub and convert to a float32 numpy array.
         """
         # Load with pydub
         audio = AudioSegment.from_file(audio_path)
         
         # Convert to mono, 16kHz
         audio = audio.set_channels(1)
-        audio = audio.set_frame_rate(16000)
-        
-        # Convert to numpy array
-        samples = np.array(audio.get_array_of_samples())
+        audio = audio.set_frame_rate(SAMPLE_RATE)
         
-        # Normalize to float32 in range [-1, 1]
-        samples = samples.astype(np.float32) / 32768.0
+        # View the raw bytes as integers of the actual sample width
+        samples = np.frombuffer(audio.raw_data, dtype=SAMPLE_DTYPES[audio.sample_width])
         
-        return samples
+        # Normalize to float32 in range [-1, 1] for 8, 16 or 32-bit samples
+        full_scale = float(1 << (8 * audio.sample_width - 1))
+        return samples.astype(np.float32) / full_scale
     
+    def _decode(self, audio_path: str):
+        """
+        Decode the file once into something Whisper accepts, memoized per
+        path and mtime so repeated calls on the same file skip decoding.
+        """
+        key = (audio_path, os.path.getmtime(audio_path))
+        if key in self._decoded:
+            self._decoded.move_to_end(key)
+            return self._decoded[key]
+
+        try:
+            print("Decoding audio with ffmpeg...")
+            audio = self._decode_with_ffmpeg(audio_path)
+        except (FileNotFoundError, RuntimeError) as e:
+            # No ffmpeg binary, or it could not read the file
+            print(f"ffmpeg decode failed: {e}")
+            print("Trying pydub...")
+            audio = self._load_audio_as_numpy(audio_path)
+
+        self._decoded[key] = audio
+        while len(self._decoded) > self._decoded_cache_size:
+            self._decoded.popitem(last=False)
+        return audio
+
+    def probe_duration(self, audio_path: str) -> float:
+        """
+        Length of the audio in seconds from the container header via
+        ffprobe, without decoding it. Falls back to decoding when ffprobe
+        is missing or cannot tell.
+        """
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            audio_path,
+        ]
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            return float(proc.stdout.strip())
+        except (FileNotFoundError, subprocess.CalledProcessError, ValueError):
+            # ValueError: "N/A" for streams without a duration in the header
+            return len(self._decode(audio_path)) / SAMPLE_RATE
+
     def transcribe(
         self, 
         audio_path: str, 
@@ -66,73 +168,196 @@ class WhisperTranscriber:
         task: str = "transcribe"
     ) -> dict:
         """
-        Transcribe audio file to text.
+        Transcribe audio file to text in a single model pass.
+        Returns text, language, and segments with start/end times and
+        word-level timestamps.
         """
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
         audio_path = os.path.abspath(audio_path)
         print(f"Processing: {audio_path}")
-        
-        try:
-            # Method 1: Try loading as numpy array directly
-            print("Loading audio as numpy array...")
-            audio_data = self._load_audio_as_numpy(audio_path)
-            
+
+        # Follow-up calls on an unchanged file reuse the last result
+        memo_key = (audio_path, os.path.getmtime(audio_path), language, task)
+        if memo_key in self._results:
+            return self._results[memo_key]
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = transcript_cache.make_key(
+                transcript_cache.hash_file(audio_path),
+                {
+                    "engine": "whisper",
+                    "model": self.model_size,
+                    "backend": self.backend,
+                    "language": language,
+                    "task": task,
+                    "word_timestamps": True,
+                },
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print("Transcript cache hit")
+                self._remember(memo_key, cached)
+                return cached
+
+        audio_data = self._decode(audio_path)
+        output = self.transcribe_array(audio_data, language=language, task=task)
+        if cache_key is not None:
+            self.cache.set(cache_key, output)
+        self._remember(memo_key, output)
+        return output
+
+    def transcribe_array(
+        self,
+        audio_data: np.ndarray,
+        language: str = None,
+        task: str = "transcribe",
+        **options
+    ) -> dict:
+        """
+        Transcribe already-decoded mono 16 kHz float32 audio. Extra options
+        are passed through to Whisper.
+        """
+        if self.backend == "ctranslate2":
+            return self._transcribe_ctranslate2(audio_data, language, task, **options)
+
+        options.setdefault("verbose", False)
+
+        # The model is shared between transcribers and Whisper's decoder
+        # is not safe to run concurrently on one model
+        with self._model_lock:
             result = self.model.transcribe(
                 audio_data,
                 language=language,
                 task=task,
-                verbose=False,
-                fp16=False
+                word_timestamps=True,
+                fp16=False,
+                **options
             )
-        except Exception as e:
-            print(f"Method 1 failed: {e}")
-            print("Trying alternative method...")
-            
-            # Method 2: Preprocess and save to temp file
-            temp_path = self._preprocess_audio(audio_path)
-            
-            result = self.model.transcribe(
-                temp_path,
+
+        segments = []
+        for segment in result.get("segments", []):
+            segments.append({
+                "start": segment["start"],
+                "end": segment["end"],
+                "text": segment["text"],
+                "words": [
+                    {
+                        "word": word["word"],
+                        "start": word["start"],
+                        "end": word["end"],
+                        "probability": word.get("probability"),
+                    }
+                    for word in segment.get("words", [])
+                ],
+            })
+
+        return {
+            "text": result["text"],
+            "language": result.get("language", "unknown"),
+            "segments": segments
+        }
+
+    def _transcribe_ctranslate2(
+        self,
+        audio_data: np.ndarray,
+        language: str = None,
+        task: str = "transcribe",
+        **options
+    ) -> dict:
+        """
+        Same output as transcribe_array, produced by faster-whisper.
+        """
+        # openai-whisper only option
+        options.pop("verbose", None)
+
+        with self._model_lock:
+            segments_iter, info = self.model.transcribe(
+                audio_data,
                 language=language,
                 task=task,
-                verbose=False,
-                fp16=False
+                word_timestamps=True,
+                **options
             )
-            
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        
+            # Segments are generated lazily; decode them while holding the lock
+            raw_segments = list(segments_iter)
+
+        segments = []
+        for segment in raw_segments:
+            segments.append({
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "words": [
+                    {
+                        "word": word.word,
+                        "start": word.start,
+                        "end": word.end,
+                        "probability": word.probability,
+                    }
+                    for word in (segment.words or [])
+                ],
+            })
+
         return {
-            "text": result["text"],
-            "language": result.get("language", "unknown"),
-            "segments": result.get("segments", [])
+            "text": "".join(seg["text"] for seg in segments),
+            "language": info.language or "unknown",
+            "segments": segments
         }
+
+    def _remember(self, key, output: dict):
+        self._results[key] = output
+        while len(self._results) > self._result_cache_size:
+            self._results.popitem(last=False)
     
-    def transcribe_with_timestamps(self, audio_path: str) -> list:
+    def transcribe_long(
+        self,
+        audio_path: str,
+        language: str = None,
+        task: str = "transcribe",
+        chunk_seconds: float = 300.0,
+        overlap_seconds: float = 2.0,
+        workers: int = None,
+    ) -> dict:
         """
-        Transcribe with timestamps.
+        Long-audio mode: split on silence and transcribe the chunks in
+        parallel worker processes. Same output shape as transcribe().
         """
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
         audio_path = os.path.abspath(audio_path)
-        audio_data = self._load_audio_as_numpy(audio_path)
-        
-        result = self.model.transcribe(
-            audio_data, 
-            word_timestamps=True, 
-            fp16=False
+        audio_data = self._decode(audio_path)
+
+        # Short files gain nothing from splitting
+        if len(audio_data) < 2 * chunk_seconds * long_audio.SAMPLE_RATE:
+            return self.transcribe(audio_path, language=language, task=task)
+
+        return long_audio.transcribe_long(
+            audio_data,
+            model_size=self.model_size,
+            language=language,
+            task=task,
+            chunk_seconds=chunk_seconds,
+            overlap_seconds=overlap_seconds,
+            workers=workers,
+            backend=self.backend,
+            device=self.device,
+            threads=self.threads,
         )
-        
-        segments = []
-        for segment in result["segments"]:
-            segments.append({
-                "start": segment["start"],
-                "end": segment["end"],
-                "text": segment["text"]
-            })
-        
-        return segments
+
+    def transcribe_with_timestamps(self, audio_path: str) -> list:
+        """
+        Transcribe with timestamps. Reuses the result of transcribe(), so
+        calling both on the same file costs one inference.
+        """
+        result = self.transcribe(audio_path)
+        return [
+            {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+            for seg in result["segments"]
+        ]
 
 
 # Usage
@@ -173,6 +398,5 @@ if __name__ == "__main__":
     print("\n" + "="*50)
     print("Timestamped Segments:")
     print("="*50)
-    segments = transcriber.transcribe_with_timestamps(audio_file)
-    for seg in segments:
+    for seg in result["segments"]:
         print(f"[{seg['start']:.2f}s - {seg['end']:.2f}s]: {seg['text']}")
@@ -0,0 +1,129 @@
+"""
+Compare Whisper inference backends on a fixed clip set.
+
+    python backend_benchmark.py clips/ --models tiny base small --threads 4
+
+Every audio file in the directory needs a reference transcript next to it
+with the same name and a .txt extension. Each backend/model combination runs
+in its own process so peak RSS is measured in isolation.
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+
+SAMPLE_RATE = 16000
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg")
+
+
+def normalise_words(text: str) -> list:
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level edit distance divided by the number of reference words.
+    """
+    ref = normalise_words(reference)
+    hyp = normalise_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(
+                previous[j] + 1,                              # deletion
+                current[j - 1] + 1,                           # insertion
+                previous[j - 1] + (ref_word != hyp_word),     # substitution
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_clip_set(directory: str) -> list:
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        reference_path = os.path.join(directory, os.path.splitext(name)[0] + ".txt")
+        if not os.path.exists(reference_path):
+            print(f"  skipping {name}: no reference transcript")
+            continue
+        with open(reference_path, "r", encoding="utf-8") as f:
+            clips.append((os.path.join(directory, name), f.read()))
+    return clips
+
+
+def run_config(model_size: str, backend: str, threads: int, clips: list, queue):
+    """
+    Runs in a fresh process: load, warm up, then time every clip.
+    """
+    from Aduio2text import WhisperTranscriber
+
+    transcriber = WhisperTranscriber(
+        model_size=model_size, cache=None, device="cpu", backend=backend, threads=threads
+    )
+    audios = [(transcriber._decode(path), reference) for path, reference in clips]
+
+    # First call pays for lazy initialisation; keep it out of the timing
+    transcriber.transcribe_array(audios[0][0][: SAMPLE_RATE * 5])
+
+    audio_seconds = 0.0
+    inference_seconds = 0.0
+    errors = []
+    for audio, reference in audios:
+        started = time.perf_counter()
+        result = transcriber.transcribe_array(audio)
+        inference_seconds += time.perf_counter() - started
+        audio_seconds += len(audio) / SAMPLE_RATE
+        errors.append(word_error_rate(reference, result["text"]))
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put({
+        "model": model_size,
+        "backend": backend,
+        "rtf": inference_seconds / audio_seconds,
+        "peak_rss_mb": peak_rss_mb,
+        "wer": sum(errors) / len(errors),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Whisper backends on CPU")
+    parser.add_argument("clips", help="Directory of audio files with .txt references")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base"])
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "ctranslate2"])
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    clips = load_clip_set(args.clips)
+    if not clips:
+        print("No clips with reference transcripts found")
+        sys.exit(1)
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for model_size in args.models:
+        for backend in args.backends:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_config, args=(model_size, backend, args.threads, clips, queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0 or queue.empty():
+                print(f"  {model_size}/{backend}: failed (exit code {proc.exitcode})")
+                continue
+            rows.append(queue.get())
+
+    print(f"\n{len(clips)} clips, {args.threads} threads")
+    print(f"{'model':8s} {'backend':12s} {'RTF':>7s} {'peak RSS':>10s} {'WER':>7s}")
+    for row in rows:
+        print(
+            f"{row['model']:8s} {row['backend']:12s} {row['rtf']:7.3f} "
+            f"{row['peak_rss_mb']:8.0f} MB {row['wer'] * 100:6.1f}%"
+        )
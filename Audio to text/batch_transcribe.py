@@ -0,0 +1,186 @@
+"""
+Batch transcription of a directory or glob of audio files.
+
+    python batch_transcribe.py clips/ --workers 4 --model base --output results.jsonl
+
+Results are appended to a JSONL file as each file finishes. A manifest next
+to it records finished files, so rerunning the same command after an
+interruption only processes what is left.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".webm", ".mp4")
+
+
+def find_audio_files(source: str, extensions=AUDIO_EXTENSIONS) -> list:
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(extensions):
+                    paths.append(os.path.join(root, name))
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def file_fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_manifest(manifest_path: str) -> set:
+    """
+    (path, size, mtime) of every file finished in a previous run. A file that
+    changed since then is transcribed again.
+    """
+    done = set()
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of an interrupted run may be cut off
+                continue
+            done.add((entry["path"], entry["size"], entry["mtime"]))
+    return done
+
+
+# ── Worker process side ───────────────────────────────────────────
+_worker_transcriber = None
+_worker_language = None
+
+
+def _init_worker(model_size: str, language: str, threads: int):
+    """
+    Runs once per worker process: the model is loaded a single time.
+    """
+    global _worker_transcriber, _worker_language
+    import torch
+
+    from Aduio2text import WhisperTranscriber
+
+    torch.set_num_threads(threads)
+    # Every file is seen once, so per-instance memos would only hold on to
+    # decoded audio
+    _worker_transcriber = WhisperTranscriber(model_size=model_size, memoize=False)
+    _worker_language = language
+
+
+def _transcribe_file(path: str) -> dict:
+    started = time.perf_counter()
+    result = _worker_transcriber.transcribe(path, language=_worker_language)
+    # From the header: a transcript cache hit must not decode the file
+    duration = _worker_transcriber.probe_duration(path)
+    return {
+        "path": path,
+        "text": result["text"],
+        "language": result["language"],
+        "segments": result["segments"],
+        "duration": round(duration, 3),
+        "processing_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_batch(
+    source: str,
+    output_path: str,
+    manifest_path: str = None,
+    model_size: str = "base",
+    workers: int = 2,
+    language: str = None,
+) -> dict:
+    manifest_path = manifest_path or output_path + ".manifest"
+
+    files = find_audio_files(source)
+    done = load_manifest(manifest_path)
+    pending = []
+    for path in files:
+        fp = file_fingerprint(path)
+        if (fp["path"], fp["size"], fp["mtime"]) not in done:
+            pending.append(fp)
+
+    print(f"{len(files)} files found, {len(files) - len(pending)} already done, {len(pending)} to go")
+    if not pending:
+        return {"files": 0, "failed": 0}
+
+    workers = max(1, min(workers, len(pending)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    completed = 0
+    failed = 0
+    audio_seconds = 0.0
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+         open(manifest_path, "a", encoding="utf-8") as manifest, \
+         ProcessPoolExecutor(
+             max_workers=workers,
+             initializer=_init_worker,
+             initargs=(model_size, language, threads),
+         ) as pool:
+
+        futures = {pool.submit(_transcribe_file, fp["path"]): fp for fp in pending}
+        for future in as_completed(futures):
+            fp = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # Not added to the manifest, so the next run retries it
+                failed += 1
+                print(f"  failed: {fp['path']}: {e}")
+                continue
+
+            # Result first, then manifest: a crash in between only means
+            # the file is transcribed again, never that it is lost
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            manifest.write(json.dumps(fp) + "\n")
+            manifest.flush()
+
+            completed += 1
+            audio_seconds += record["duration"]
+            print(f"  [{completed + failed}/{len(pending)}] {fp['path']}")
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "files": completed,
+        "failed": failed,
+        "wall_seconds": round(elapsed, 1),
+        "files_per_minute": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+        "audio_seconds": round(audio_seconds, 1),
+        # Seconds of processing per second of audio; below 1 is faster than realtime
+        "realtime_factor": round(elapsed / audio_seconds, 3) if audio_seconds else None,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe a directory of audio files with Whisper")
+    parser.add_argument("source", help="Directory or glob pattern, e.g. 'clips/**/*.wav'")
+    parser.add_argument("--output", default="transcripts.jsonl")
+    parser.add_argument("--manifest", default=None, help="Defaults to <output>.manifest")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--language", default=None)
+    args = parser.parse_args()
+
+    report = run_batch(
+        args.source,
+        args.output,
+        manifest_path=args.manifest,
+        model_size=args.model,
+        workers=args.workers,
+        language=args.language,
+    )
+
+    print("\n" + "=" * 50)
+    for key, value in report.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,71 @@
+"""
+Compare the old decode path (pydub, fixed /32768 scaling, temp WAV fallback)
+with the ffmpeg pipe used by WhisperTranscriber now.
+
+    python decode_benchmark.py catch.wav [runs]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+from Aduio2text import WhisperTranscriber
+
+
+def old_numpy_path(audio_path: str) -> np.ndarray:
+    audio = AudioSegment.from_file(audio_path).set_channels(1).set_frame_rate(16000)
+    samples = np.array(audio.get_array_of_samples())
+    return samples.astype(np.float32) / 32768.0
+
+
+def old_temp_file_path(audio_path: str) -> np.ndarray:
+    import whisper
+
+    audio = AudioSegment.from_file(audio_path)
+    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    temp_path = os.path.join(tempfile.gettempdir(), "whisper_temp.wav")
+    audio.export(temp_path, format="wav")
+    try:
+        return whisper.load_audio(temp_path)
+    finally:
+        os.remove(temp_path)
+
+
+def best_of(fn, audio_path: str, runs: int):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        samples = fn(audio_path)
+        times.append(time.perf_counter() - started)
+    return min(times), samples
+
+
+if __name__ == "__main__":
+    audio_file = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else "catch.wav")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # Only the decode helpers are needed, not a loaded model
+    transcriber = WhisperTranscriber.__new__(WhisperTranscriber)
+
+    candidates = {
+        "old pydub numpy": old_numpy_path,
+        "old pydub + temp wav": old_temp_file_path,
+        "pydub raw_data": transcriber._load_audio_as_numpy,
+        "ffmpeg pipe": transcriber._decode_with_ffmpeg,
+    }
+
+    reference = None
+    for name, fn in candidates.items():
+        seconds, samples = best_of(fn, audio_file, runs)
+        if reference is None:
+            reference = samples
+        n = min(len(reference), len(samples))
+        peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+        diff = float(np.max(np.abs(reference[:n] - samples[:n]))) if n else 0.0
+        print(
+            f"{name:22s} {seconds * 1000:8.1f} ms  "
+            f"peak {peak:.4f}  max diff vs old {diff:.4f}"
+        )
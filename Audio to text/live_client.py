@@ -0,0 +1,69 @@
+"""
+Feed a WAV file to the /convert/live WebSocket at real-time speed and check
+end-to-end latency.
+
+    python live_client.py catch.wav ws://localhost:8000/convert/live 3000
+
+Exits non-zero if the p95 audio-in to text-out latency is above the limit (ms).
+"""
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+import websockets
+
+from Aduio2text import WhisperTranscriber
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 0.1
+
+
+async def stream_file(audio_path: str, url: str) -> list:
+    # Decode helpers only; no model needed on the client side
+    transcriber = WhisperTranscriber.__new__(WhisperTranscriber)
+    audio = transcriber._decode_with_ffmpeg(audio_path)
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+    chunk_bytes = int(CHUNK_SECONDS * SAMPLE_RATE) * 2
+
+    latencies = []
+    async with websockets.connect(url) as ws:
+
+        async def send():
+            started = time.perf_counter()
+            for i, pos in enumerate(range(0, len(pcm), chunk_bytes)):
+                await ws.send(pcm[pos:pos + chunk_bytes])
+                # Keep to real time rather than sending as fast as possible
+                delay = started + (i + 1) * CHUNK_SECONDS - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await ws.send("end")
+
+        sender = asyncio.create_task(send())
+        async for raw in ws:
+            message = json.loads(raw)
+            if message["type"] == "done":
+                print(f"server latency summary: {message['latency']}")
+                break
+            latencies.append(message["latency_ms"])
+            print(f"[{message['type']:7s}] {message.get('start', 0):6.2f}s "
+                  f"({message['latency_ms']:.0f} ms) {message['text']}")
+        await sender
+
+    return latencies
+
+
+if __name__ == "__main__":
+    audio_file = sys.argv[1] if len(sys.argv) > 1 else "catch.wav"
+    url = sys.argv[2] if len(sys.argv) > 2 else "ws://localhost:8000/convert/live"
+    limit_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 3000.0
+
+    latencies = asyncio.run(stream_file(audio_file, url))
+    if not latencies:
+        print("No transcript messages received")
+        sys.exit(1)
+
+    p95 = float(np.percentile(latencies, 95))
+    print(f"p95 latency {p95:.0f} ms (limit {limit_ms:.0f} ms)")
+    sys.exit(0 if p95 <= limit_ms else 1)
@@ -0,0 +1,231 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def frame_energy(audio: np.ndarray, frame_ms: int = 30) -> np.ndarray:
+    """
+    RMS energy of consecutive non-overlapping frames.
+    """
+    frame_len = int(SAMPLE_RATE * frame_ms / 1000)
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n_frames * frame_len].reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def find_split_points(
+    audio: np.ndarray,
+    chunk_seconds: float = 300.0,
+    search_seconds: float = 15.0,
+    frame_ms: int = 30,
+) -> list:
+    """
+    Sample indices to cut the audio at. Every chunk_seconds we look
+    search_seconds either side for the quietest stretch (energy-based VAD),
+    so cuts land in pauses rather than mid-word.
+    """
+    frame_len = int(SAMPLE_RATE * frame_ms / 1000)
+    energy = frame_energy(audio, frame_ms)
+    if len(energy) == 0:
+        return []
+
+    # Smooth over ~300 ms so a single quiet frame inside a word does not win
+    window = max(1, 300 // frame_ms)
+    smoothed = np.convolve(energy, np.ones(window) / window, mode="same")
+
+    frames_per_chunk = int(chunk_seconds * 1000 / frame_ms)
+    search = int(search_seconds * 1000 / frame_ms)
+
+    splits = []
+    target = frames_per_chunk
+    while target < len(smoothed) - search:
+        lo = max(target - search, (splits[-1] // frame_len if splits else 0) + 1)
+        hi = min(target + search, len(smoothed))
+        quietest = lo + int(np.argmin(smoothed[lo:hi]))
+        splits.append(quietest * frame_len)
+        target = quietest + frames_per_chunk
+
+    return splits
+
+
+def make_chunks(audio: np.ndarray, splits: list, overlap_seconds: float = 2.0) -> list:
+    """
+    Chunks as dicts with the padded sample range that is transcribed and the
+    nominal [keep_start, keep_end) range (in seconds) whose segments are kept.
+    """
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    bounds = [0] + list(splits) + [len(audio)]
+
+    chunks = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        padded_start = max(0, start - overlap)
+        padded_end = min(len(audio), end + overlap)
+        chunks.append({
+            "offset": padded_start / SAMPLE_RATE,
+            "keep_start": start / SAMPLE_RATE,
+            "keep_end": end / SAMPLE_RATE,
+            "audio": audio[padded_start:padded_end],
+        })
+    return chunks
+
+
+# ── Worker process side ───────────────────────────────────────────
+_worker_transcriber = None
+
+
+def _init_worker(model_size: str, backend: str, device: str, threads: int):
+    """
+    Runs once per worker process: load the model a single time, with the
+    same backend and device as the transcriber that started the pool.
+    """
+    global _worker_transcriber
+    # Imported here: Aduio2text imports this module
+    from Aduio2text import WhisperTranscriber
+
+    _worker_transcriber = WhisperTranscriber(
+        model_size=model_size, cache=None, device=device, backend=backend, threads=threads
+    )
+
+
+def _transcribe_chunk(args):
+    audio, language, task = args
+    # Same backend-aware path as a single-pass transcribe
+    return _worker_transcriber.transcribe_array(
+        audio,
+        language=language,
+        task=task,
+        # Chunks are independent; earlier text from another chunk is not
+        # available, so do not condition on it
+        condition_on_previous_text=False,
+    )
+
+
+# ── Stitching ─────────────────────────────────────────────────────
+def stitch(chunks: list, results: list) -> dict:
+    """
+    Shift each chunk's segments onto the global timeline and keep only those
+    whose midpoint falls inside the chunk's nominal range, which drops the
+    duplicates produced by the overlap.
+    """
+    segments = []
+    languages = []
+
+    for chunk, result in zip(chunks, results):
+        languages.append(result.get("language"))
+        offset = chunk["offset"]
+
+        for segment in result.get("segments", []):
+            start = segment["start"] + offset
+            end = segment["end"] + offset
+            middle = (start + end) / 2
+            if not (chunk["keep_start"] <= middle < chunk["keep_end"]):
+                continue
+
+            segments.append({
+                "start": start,
+                "end": end,
+                "text": segment["text"],
+                "words": [
+                    {
+                        "word": word["word"],
+                        "start": word["start"] + offset,
+                        "end": word["end"] + offset,
+                        "probability": word.get("probability"),
+                    }
+                    for word in segment.get("words", [])
+                ],
+            })
+
+    languages = [lang for lang in languages if lang]
+    language = max(set(languages), key=languages.count) if languages else "unknown"
+
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "language": language,
+        "segments": segments,
+    }
+
+
+def transcribe_long(
+    audio: np.ndarray,
+    model_size: str = "base",
+    language: str = None,
+    task: str = "transcribe",
+    chunk_seconds: float = 300.0,
+    overlap_seconds: float = 2.0,
+    workers: int = None,
+    backend: str = "torch",
+    device: str = None,
+    threads: int = 0,
+) -> dict:
+    """
+    Split on silence, transcribe chunks across a process pool and stitch the
+    results back into one transcript. backend and device are those of
+    model_registry; threads is per worker and defaults to an even share of
+    the cores.
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // 2)
+    chunks = make_chunks(audio, find_split_points(audio, chunk_seconds), overlap_seconds)
+    workers = min(workers, len(chunks))
+
+    # Share the cores between workers instead of oversubscribing them
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+
+    print(f"Transcribing {len(chunks)} chunks on {workers} worker(s)")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_size, backend, device, threads),
+    ) as pool:
+        results = list(pool.map(
+            _transcribe_chunk,
+            [(chunk["audio"], language, task) for chunk in chunks],
+        ))
+
+    return stitch(chunks, results)
+
+
+# Benchmark: wall-clock vs chunk count, and how close the stitched text is
+# to the single-pass transcript
+if __name__ == "__main__":
+    import difflib
+    import sys
+
+    from Aduio2text import WhisperTranscriber
+
+    audio_file = sys.argv[1] if len(sys.argv) > 1 else "catch.wav"
+    model_size = sys.argv[2] if len(sys.argv) > 2 else "base"
+
+    transcriber = WhisperTranscriber(model_size=model_size, cache=None)
+    audio = transcriber._decode(os.path.abspath(audio_file))
+    duration = len(audio) / SAMPLE_RATE
+
+    started = time.perf_counter()
+    reference = transcriber.transcribe_array(audio)
+    single_time = time.perf_counter() - started
+    reference_words = reference["text"].split()
+    print(f"single pass: {single_time:.1f}s for {duration:.0f}s of audio")
+
+    for n_chunks in (2, 4, 8):
+        chunk_seconds = duration / n_chunks
+        started = time.perf_counter()
+        result = transcribe_long(
+            audio, model_size, chunk_seconds=chunk_seconds, workers=n_chunks,
+            backend=transcriber.backend, device=transcriber.device,
+        )
+        elapsed = time.perf_counter() - started
+
+        similarity = difflib.SequenceMatcher(
+            None, reference_words, result["text"].split()
+        ).ratio()
+        print(
+            f"{n_chunks} chunks: {elapsed:.1f}s "
+            f"(speedup {single_time / elapsed:.2f}x), "
+            f"word agreement with single pass {similarity:.3f}"
+        )
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+
+import torch
+import whisper
+
+logger = logging.getLogger(__name__)
+
+# Inference engines a model can be loaded with:
+#   torch        stock openai-whisper
+#   torch-int8   openai-whisper with Linear layers dynamically quantised to int8 (CPU)
+#   ctranslate2  faster-whisper / CTranslate2, int8 on CPU (optional dependency)
+BACKENDS = ("torch", "torch-int8", "ctranslate2")
+
+# (model_size, device, backend) -> loaded model, shared by every transcriber
+# in the process
+_models = {}
+_stats = {}
+_registry_lock = threading.Lock()
+_load_locks = {}
+_inference_locks = {}
+
+
+def resolve_device(device: str = None) -> str:
+    if device:
+        return device
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _rss_bytes() -> int:
+    """
+    Current resident set size of this process (Linux), 0 if unavailable.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _load(model_size: str, device: str, backend: str, threads: int = 0):
+    if backend == "torch":
+        return whisper.load_model(model_size, device=device)
+
+    if backend == "torch-int8":
+        if device != "cpu":
+            raise ValueError("torch-int8 backend only runs on CPU")
+        model = whisper.load_model(model_size, device="cpu")
+        # Whisper's Linear subclass only adds dtype casting; make it a plain
+        # nn.Linear so quantize_dynamic recognises and swaps it
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if backend == "ctranslate2":
+        from faster_whisper import WhisperModel
+
+        compute_type = "int8" if device == "cpu" else "float16"
+        # cpu_threads=0 lets CTranslate2 pick its default
+        return WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=threads)
+
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+def _weight_bytes(model) -> int:
+    if hasattr(model, "parameters"):
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    # CTranslate2 keeps weights outside Python; RSS delta is the figure to use
+    return 0
+
+
+def get_model(model_size: str = "base", device: str = None, backend: str = "torch", threads: int = 0):
+    """
+    Return the shared model for this size, device and backend, loading it on
+    first use. Concurrent callers for the same model wait for a single load;
+    different models load independently. threads sets CTranslate2's CPU
+    threads and only applies to the call that loads the model.
+    """
+    key = (model_size, resolve_device(device), backend)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        model = _load(model_size, key[1], backend, threads)
+        load_seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        weight_bytes = _weight_bytes(model)
+        _stats[key] = {
+            "model": model_size,
+            "device": key[1],
+            "backend": backend,
+            "load_seconds": round(load_seconds, 3),
+            "rss_delta_mb": round((rss_after - rss_before) / (1024 * 1024), 1),
+            "weights_mb": round(weight_bytes / (1024 * 1024), 1),
+        }
+        logger.info(
+            "Loaded Whisper %s (%s) on %s in %.2fs (rss +%.1f MB, weights %.1f MB)",
+            model_size, backend, key[1], load_seconds,
+            _stats[key]["rss_delta_mb"], _stats[key]["weights_mb"],
+        )
+
+        _models[key] = model
+        return model
+
+
+def get_lock(model_size: str = "base", device: str = None, backend: str = "torch") -> threading.Lock:
+    """
+    Lock to hold while running inference on the shared model.
+    """
+    key = (model_size, resolve_device(device), backend)
+    with _registry_lock:
+        return _inference_locks.setdefault(key, threading.Lock())
+
+
+def preload(model_sizes, device: str = None, backend: str = "torch", threads: int = 0) -> None:
+    """
+    Load the given models up front, e.g. from a FastAPI startup hook. Use the
+    same backend and threads the transcribers will ask for.
+    """
+    for model_size in model_sizes:
+        get_model(model_size, device, backend, threads)
+
+
+def stats() -> list:
+    """
+    Load time and memory figures for every model loaded so far.
+    """
+    return list(_stats.values())
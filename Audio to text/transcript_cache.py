@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """
+    SHA-256 of the file contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(audio_hash: str, config: dict) -> str:
+    """
+    Cache key for one audio file transcribed with one engine/model/config.
+    """
+    config_part = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{audio_hash}:{config_part}".encode("utf-8")).hexdigest()
+
+
+class DiskTranscriptCache:
+    """
+    On-disk LRU of transcripts. One JSON file per entry; the least recently
+    used entries are removed once the directory grows past max_bytes.
+
+    Size and recency come from the files themselves (st_size, and st_mtime
+    bumped on every hit), never from process memory, so several workers
+    can share one directory. Only the hit/miss counters are per process.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _scan(self) -> list:
+        """(mtime, size, path) of every entry currently on disk."""
+        files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Evicted by another worker mid-scan
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict(self):
+        files = self._scan()
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # Mark as recently used for whichever worker evicts next
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker since the read; the value is still good
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value) -> None:
+        data = json.dumps(value).encode("utf-8")
+        # Write then rename so readers never see a half written entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+
+        # A directory scan is cheap next to the transcription that produced
+        # the entry, and it sees what the other workers wrote
+        with self._lock:
+            self._evict()
+
+    def stats(self) -> dict:
+        files = self._scan()
+        total = self.hits + self.misses
+        return {
+            "backend": "disk",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(files),
+            "bytes": sum(size for _, size, _ in files),
+        }
+
+
+class RedisTranscriptCache:
+    """
+    Transcripts stored in Redis; Redis' own maxmemory policy does the eviction.
+    """
+
+    def __init__(self, url: str, prefix: str = "transcript:", ttl_seconds: int = None):
+        import redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        raw = self._redis.get(self._prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value) -> None:
+        self._redis.set(self._prefix + key, json.dumps(value), ex=self._ttl)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def create_transcript_cache():
+    """
+    Disk cache by default. TRANSCRIPT_CACHE_BACKEND=redis (or USE_REDIS=true)
+    switches to Redis; TRANSCRIPT_CACHE_BACKEND=off disables caching.
+    """
+    use_redis = os.getenv("USE_REDIS", "false").lower() == "true"
+    backend = os.getenv("TRANSCRIPT_CACHE_BACKEND", "redis" if use_redis else "disk").lower()
+
+    if backend == "off":
+        return None
+
+    if backend == "redis":
+        host = os.getenv("REDIS_HOST", "localhost")
+        port = os.getenv("REDIS_PORT", "6379")
+        url = os.getenv("REDIS_URL", f"redis://{host}:{port}/0")
+        ttl = os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS")
+        return RedisTranscriptCache(url, ttl_seconds=int(ttl) if ttl else None)
+
+    directory = os.getenv(
+        "TRANSCRIPT_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "transcript_cache"),
+    )
+    max_mb = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512"))
+    return DiskTranscriptCache(directory, max_mb * 1024 * 1024)
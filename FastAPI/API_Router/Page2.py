@@ -2,9 +2,14 @@ from fastapi import APIRouter, File, UploadFile, status
 from fastapi.responses import JSONResponse
 import assemblyai as aai
 import tempfile
+import asyncio
+import hashlib
 from dotenv import load_dotenv
 import os
 import logging
+from . import jobs
+from . import audio_lib  # noqa: F401  (puts "Audio to text" on sys.path)
+import transcript_cache
 
 load_dotenv()
 
@@ -17,9 +22,161 @@ if not ASSEMBLY_API_KEY:
 aai.settings.api_key = ASSEMBLY_API_KEY
 logger = logging.getLogger(__name__)
 
-@router.post("/speech2text")
+# Uploads are copied to disk in chunks of this size so a large recording
+# never sits in worker memory as one bytes object.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "500")) * 1024 * 1024
+
+# Leading bytes of the audio containers we accept
+AUDIO_SIGNATURES = (
+    b"ID3",           # mp3 with ID3 tag
+    b"\xff\xfb", b"\xff\xf3", b"\xff\xf2",  # mp3 frame sync
+    b"\xff\xf1", b"\xff\xf9",  # aac (adts)
+    b"OggS",          # ogg / opus
+    b"fLaC",          # flac
+    b"\x1aE\xdf\xa3",  # webm / mkv
+)
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def looks_like_audio(head: bytes) -> bool:
+    """
+    Judged from the file's own leading bytes only; the client's
+    Content-Type header is not trusted.
+    """
+    if head.startswith(AUDIO_SIGNATURES):
+        return True
+    # wav: RIFF container with a WAVE form type (RIFF alone is also avi)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return True
+    # mp4 / m4a: "ftyp" box after the 4 byte size field
+    return head[4:8] == b"ftyp"
+
+
+async def save_upload(file: UploadFile, dest, hasher=None) -> int:
+    """
+    Copy the upload into an open file in bounded chunks, feeding each chunk
+    to hasher if given. Rejects empty, non-audio and oversized uploads as
+    early as possible. Returns the number of bytes written.
+    """
+    # Fail fast when the client told us the size up front
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise UploadRejected(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+        )
+
+    written = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        if written == 0 and not looks_like_audio(chunk[:16]):
+            raise UploadRejected(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                "Uploaded file is not a supported audio format"
+            )
+
+        written += len(chunk)
+        if written > MAX_UPLOAD_BYTES:
+            raise UploadRejected(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+            )
+        dest.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+
+    if written == 0:
+        raise UploadRejected(status.HTTP_400_BAD_REQUEST, "Uploaded file is empty")
+    return written
+
+
+class TranscriptionFailed(Exception):
+    pass
+
+
+def transcribe_file(path: str) -> str:
+    """
+    Blocking AssemblyAI call: uploads the file and polls until the
+    transcript is ready. Must run off the event loop.
+    """
+    config = aai.TranscriptionConfig(speech_models=["universal"])
+    transcriber = aai.Transcriber(config=config)
+    transcript = transcriber.transcribe(path)
+
+    if transcript.status == "error":
+        logger.error("AssemblyAI error: %s", transcript.error)
+        raise TranscriptionFailed(f"Transcription failed: {transcript.error}")
+
+    if not transcript.text:
+        raise TranscriptionFailed("Transcription completed but no text was returned")
+
+    return transcript.text
+
+
+# Identifies the engine settings in the transcript cache key
+ASSEMBLY_CACHE_CONFIG = {"engine": "assemblyai", "speech_models": ["universal"]}
+
+transcript_store = transcript_cache.create_transcript_cache()
+
+# Swappable so tests can run a local fake instead of calling AssemblyAI
+transcribe_backend = transcribe_file
+
+job_store = jobs.create_job_store()
+
+# Caps how many transcriptions run at once on this worker
+MAX_CONCURRENT_TRANSCRIPTIONS = int(os.getenv("MAX_CONCURRENT_TRANSCRIPTIONS", "4"))
+_transcription_slots = asyncio.Semaphore(MAX_CONCURRENT_TRANSCRIPTIONS)
+
+# Strong references so running jobs are not garbage collected
+_running_tasks = set()
+
+
+def remove_temp_file(path: str):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except Exception:
+            logger.warning("Failed to delete temp file: %s", path)
+
+
+async def run_transcription_job(job_id: str, tmp_path: str, cache_key: str = None):
+    try:
+        async with _transcription_slots:
+            await job_store.update(job_id, status=jobs.RUNNING)
+            text = await asyncio.to_thread(transcribe_backend, tmp_path)
+        result = {"text": text}
+        if transcript_store is not None and cache_key:
+            await asyncio.to_thread(transcript_store.set, cache_key, result)
+        await job_store.update(job_id, status=jobs.DONE, result=result)
+
+    except TranscriptionFailed as e:
+        await job_store.update(job_id, status=jobs.FAILED, error=str(e))
+
+    except aai.AssemblyAIError:
+        logger.exception("AssemblyAI SDK error")
+        await job_store.update(job_id, status=jobs.FAILED, error="Speech-to-text service error")
+
+    except Exception:
+        logger.exception("Unexpected error in transcription job %s", job_id)
+        await job_store.update(job_id, status=jobs.FAILED, error="Internal server error")
+
+    finally:
+        remove_temp_file(tmp_path)
+
+
+@router.post("/speech2text", status_code=status.HTTP_202_ACCEPTED)
 async def audio_creation(file: UploadFile = File(...)):
     tmp_path = None
+    queued = False
 
     try:
         # Check if file was provided
@@ -33,77 +190,80 @@ async def audio_creation(file: UploadFile = File(...)):
                 }
             )
 
-        # Save uploaded file to temporary location
+        # Stream uploaded file to temporary location, hashing as we go
+        hasher = hashlib.sha256()
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            content = await file.read()
-            if not content:
+            tmp_path = tmp.name
+            try:
+                await save_upload(file, tmp, hasher)
+            except UploadRejected as e:
                 return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
+                    status_code=e.status_code,
                     content={
                         "status": 0,
                         "message": "Validation failed. Please check your input.",
-                        "errors": {"title": ["Uploaded file is empty"]}
+                        "errors": {"title": [e.message]}
                     }
                 )
-            tmp.write(content)
-            tmp_path = tmp.name
 
-        # Configure AssemblyAI transcriber
-        config = aai.TranscriptionConfig(speech_models=["universal"])
-        transcriber = aai.Transcriber(config=config)
-        transcript = transcriber.transcribe(tmp_path)
+        # Same audio already transcribed: finish the job without AssemblyAI
+        cache_key = transcript_cache.make_key(hasher.hexdigest(), ASSEMBLY_CACHE_CONFIG)
+        if transcript_store is not None:
+            cached = await asyncio.to_thread(transcript_store.get, cache_key)
+            if cached is not None:
+                job = await job_store.create()
+                await job_store.update(job["id"], status=jobs.DONE, result=cached)
+                return {"job_id": job["id"], "status": jobs.DONE, "result": cached}
 
-        # Check transcription status
-        if transcript.status == "error":
-            logger.error("AssemblyAI error: %s", transcript.error)
-            return JSONResponse(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                content={
-                    "status": 0,
-                    "message": "Validation failed. Please check your input.",
-                    "errors": {"title": [f"Transcription failed: {transcript.error}"]}
-                }
-            )
+        # Hand the file to a background job and answer right away
+        job = await job_store.create()
+        task = asyncio.create_task(run_transcription_job(job["id"], tmp_path, cache_key))
+        _running_tasks.add(task)
+        task.add_done_callback(_running_tasks.discard)
+        queued = True
 
-        if not transcript.text:
-            return JSONResponse(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                content={
-                    "status": 0,
-                    "message": "Validation failed. Please check your input.",
-                    "errors": {"title": ["Transcription completed but no text was returned"]}
-                }
-            )
+        return {"job_id": job["id"], "status": job["status"]}
 
-        # Success response
-        return {"text": transcript.text}
-
-    except aai.AssemblyAIError as e:
-        logger.exception("AssemblyAI SDK error")
+    except Exception as e:
+        logger.exception("Unexpected server error")
         return JSONResponse(
-            status_code=status.HTTP_502_BAD_GATEWAY,
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={
                 "status": 0,
                 "message": "Validation failed. Please check your input.",
-                "errors": {"title": ["Speech-to-text service error"]}
+                "errors": {"title": ["Internal server error"]}
             }
         )
 
-    except Exception as e:
-        logger.exception("Unexpected server error")
+    finally:
+        # The job owns the temp file once queued
+        if not queued:
+            remove_temp_file(tmp_path)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_store.get(job_id)
+    if job is None:
         return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=status.HTTP_404_NOT_FOUND,
             content={
                 "status": 0,
-                "message": "Validation failed. Please check your input.",
-                "errors": {"title": ["Internal server error"]}
+                "message": "Job not found.",
+                "errors": {"title": [f"No job with id {job_id}"]}
             }
         )
 
-    finally:
-        # Clean up temporary file
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                logger.warning("Failed to delete temp file: %s", tmp_path)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    if transcript_store is None:
+        return {"backend": "off"}
+    return transcript_store.stats()
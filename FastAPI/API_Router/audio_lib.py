@@ -0,0 +1,11 @@
+"""
+Makes the modules in "Audio to text" (Whisper transcriber, transcript cache)
+importable from the API routers. Import this before importing them.
+"""
+import sys
+from pathlib import Path
+
+AUDIO_LIB_DIR = Path(__file__).resolve().parents[2] / "Audio to text"
+
+if str(AUDIO_LIB_DIR) not in sys.path:
+    sys.path.insert(0, str(AUDIO_LIB_DIR))
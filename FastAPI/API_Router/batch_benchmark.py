@@ -0,0 +1,100 @@
+"""
+End-to-end throughput of /info/generate/batch against a fake LLM.
+
+    python -m FastAPI.API_Router.batch_benchmark --items 200 --latency 3.0
+
+Compares sequential POSTs to /info/generate with one batch request at a few
+concurrency limits. The fake answers after a latency drawn around --latency
+seconds, like gpt-4o on a ~3 KB prompt.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import httpx
+from fastapi import FastAPI
+
+from . import llm_lib  # noqa: F401
+from . import page1
+import llm_client
+
+
+class FakeResponses:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def create(self, model: str, input: str, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        output = {
+            "content_title": "Soft Hands Catching Drill",
+            "description": "A simple catching drill.",
+            "skill": ["Fielding"],
+            "skill_level": "Beginner",
+        }
+        return SimpleNamespace(
+            output_text=json.dumps(output),
+            usage=SimpleNamespace(input_tokens=len(input) // 4, output_tokens=80),
+        )
+
+
+def make_items(n: int, run: str) -> list:
+    # Unique subtitles so the response cache does not short-circuit the run
+    return [
+        {"subtitle": f"Keep the hands together out in front, {run} drill {i}.", "category": "Technique"}
+        for i in range(n)
+    ]
+
+
+async def run_sequential(client: httpx.AsyncClient, items: list) -> float:
+    started = time.perf_counter()
+    for item in items:
+        await client.post("/info/generate", json=item)
+    return time.perf_counter() - started
+
+
+async def run_batch(client: httpx.AsyncClient, items: list, concurrency: int) -> float:
+    started = time.perf_counter()
+    ok = 0
+    async with client.stream(
+        "POST", "/info/generate/batch", json={"items": items, "concurrency": concurrency}
+    ) as response:
+        async for line in response.aiter_lines():
+            if line and json.loads(line)["status"] == 1:
+                ok += 1
+    assert ok == len(items), f"{len(items) - ok} items failed"
+    return time.perf_counter() - started
+
+
+async def main(n_items: int, latency: float, sequential_items: int):
+    fake = FakeResponses(latency)
+    llm_client._client = SimpleNamespace(responses=fake)
+
+    app = FastAPI()
+    app.include_router(page1.router)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        seq_items = make_items(sequential_items, "sequential")
+        seq_seconds = await run_sequential(client, seq_items)
+        print(f"sequential      {sequential_items / seq_seconds * 60:8.1f} items/min")
+
+        for concurrency in (4, 8, 16, 32):
+            seconds = await run_batch(client, make_items(n_items, f"batch{concurrency}"), concurrency)
+            print(f"batch x{concurrency:<2d}       {n_items / seconds * 60:8.1f} items/min")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=3.0)
+    parser.add_argument("--sequential-items", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.latency, args.sequential_items))
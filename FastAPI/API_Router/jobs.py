@@ -0,0 +1,111 @@
+import json
+import os
+import time
+import uuid
+from typing import Optional
+
+# Job lifecycle
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Finished jobs are kept around this long so clients can still poll them
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+
+
+def new_job() -> dict:
+    now = time.time()
+    return {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class InMemoryJobStore:
+    """
+    Job state kept in a dict. Only visible to the worker that created it.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+
+    def _evict_expired(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in (DONE, FAILED) and job["updated_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def create(self) -> dict:
+        self._evict_expired()
+        job = new_job()
+        self._jobs[job["id"]] = job
+        return dict(job)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def update(self, job_id: str, **fields) -> None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.update(fields, updated_at=time.time())
+
+
+class RedisJobStore:
+    """
+    Job state kept in Redis so every worker behind the load balancer sees it.
+    Each job is a hash with one JSON-encoded value per field, so an update
+    only writes the fields it changes and cannot overwrite another worker's.
+    """
+
+    def __init__(self, url: str, prefix: str = "speech2text:job:"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+
+    async def _write(self, job_id: str, fields: dict) -> None:
+        key = self._prefix + job_id
+        mapping = {name: json.dumps(value) for name, value in fields.items()}
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, JOB_TTL_SECONDS)
+            await pipe.execute()
+
+    async def create(self) -> dict:
+        job = new_job()
+        await self._write(job["id"], job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        raw = await self._redis.hgetall(self._prefix + job_id)
+        if "id" not in raw:
+            return None
+        return {name: json.loads(value) for name, value in raw.items()}
+
+    async def update(self, job_id: str, **fields) -> None:
+        if not await self._redis.exists(self._prefix + job_id):
+            return
+        await self._write(job_id, {**fields, "updated_at": time.time()})
+
+
+def create_job_store():
+    """
+    In-memory by default; set USE_REDIS=true (as in docker-compose) to share
+    job state through Redis.
+    """
+    if os.getenv("USE_REDIS", "false").lower() == "true":
+        host = os.getenv("REDIS_HOST", "localhost")
+        port = os.getenv("REDIS_PORT", "6379")
+        url = os.getenv("REDIS_URL", f"redis://{host}:{port}/0")
+        return RedisJobStore(url)
+    return InMemoryJobStore()
@@ -0,0 +1,129 @@
+"""
+End-to-end check of the /convert/speech2text job flow with a local fake
+transcriber instead of AssemblyAI.
+
+    python -m FastAPI.API_Router.jobs_check
+    python -m FastAPI.API_Router.jobs_check --redis redis://localhost:6379/0
+
+Uploads a small WAV, expects 202 with a job id, and polls /convert/jobs/{id}
+until the job is done. Also checks that the same audio is answered from the
+transcript cache without a new transcription, that a failing transcription
+ends as a failed job, and that a non-audio file is rejected even when the
+client labels it audio/wav. With --redis the jobs live in a RedisJobStore.
+"""
+import argparse
+import asyncio
+import os
+import struct
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("ASSEMBLY_API_KEY", "check")
+
+import httpx
+from fastapi import FastAPI
+
+from . import Page2
+from . import jobs
+from . import audio_lib  # noqa: F401  (puts "Audio to text" on sys.path)
+import transcript_cache
+
+
+class FakeTranscriber:
+    """Stands in for transcribe_file: blocks for a while, then answers."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, path: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        with open(path, "rb") as f:
+            content = f.read()
+        if b"FAIL" in content:
+            raise Page2.TranscriptionFailed("Transcription failed: fake error")
+        return f"fake transcript of {len(content)} bytes"
+
+
+def wav_bytes(payload: bytes) -> bytes:
+    header = b"RIFF" + struct.pack("<I", 36 + len(payload)) + b"WAVE"
+    header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, 16000, 32000, 2, 16)
+    return header + b"data" + struct.pack("<I", len(payload)) + payload
+
+
+async def upload(client: httpx.AsyncClient, content: bytes, content_type: str = "audio/wav") -> httpx.Response:
+    return await client.post("/convert/speech2text", files={"file": ("clip.wav", content, content_type)})
+
+
+async def poll(client: httpx.AsyncClient, job_id: str, timeout: float = 10.0) -> tuple:
+    """Final job body and the statuses seen on the way."""
+    seen = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = await client.get(f"/convert/jobs/{job_id}")
+        assert response.status_code == 200, response.text
+        body = response.json()
+        if not seen or seen[-1] != body["status"]:
+            seen.append(body["status"])
+        if body["status"] in (jobs.DONE, jobs.FAILED):
+            return body, seen
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {seen[-1]} after {timeout}s")
+
+
+async def main(redis_url: str, delay: float):
+    fake = FakeTranscriber(delay)
+    Page2.transcribe_backend = fake
+    if redis_url:
+        Page2.job_store = jobs.RedisJobStore(redis_url, prefix="speech2text:jobcheck:")
+
+    app = FastAPI()
+    app.include_router(Page2.router)
+    transport = httpx.ASGITransport(app=app)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        Page2.transcript_store = transcript_cache.DiskTranscriptCache(tmpdir, 1024 * 1024)
+        audio = wav_bytes(os.urandom(32000))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://check", timeout=None) as client:
+            response = await upload(client, audio)
+            assert response.status_code == 202, response.text
+            job = response.json()
+            assert job["status"] == jobs.QUEUED, job
+            body, seen = await poll(client, job["job_id"])
+            print(f"Queued job: statuses {' -> '.join([job['status']] + seen)}")
+            assert body["status"] == jobs.DONE and body["result"]["text"].startswith("fake transcript"), body
+
+            response = await upload(client, audio)
+            body = response.json()
+            print(f"Same audio again: {body['status']} at once, transcriber calls {fake.calls}")
+            assert body["status"] == jobs.DONE and fake.calls == 1, body
+
+            response = await upload(client, wav_bytes(b"FAIL" + os.urandom(1000)))
+            body, _ = await poll(client, response.json()["job_id"])
+            print(f"Failing transcription: {body['status']}, error {body['error']!r}")
+            assert body["status"] == jobs.FAILED and body["error"], body
+
+            response = await upload(client, b"%PDF-1.7 not audio at all", "audio/wav")
+            print(f"PDF labelled audio/wav: HTTP {response.status_code}")
+            assert response.status_code == 415, response.text
+
+            response = await client.get("/convert/jobs/does-not-exist")
+            assert response.status_code == 404, response.text
+
+        # Jobs write to the cache directory, so let them finish before it goes
+        while Page2._running_tasks:
+            await asyncio.sleep(0.01)
+    print("\nAll checks passed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis", help="Redis URL; uses the in-memory job store if omitted")
+    parser.add_argument("--delay", type=float, default=0.3, help="seconds the fake transcriber takes")
+    args = parser.parse_args()
+    asyncio.run(main(args.redis, args.delay))
@@ -0,0 +1,220 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
+import logging
+import os
+import time
+import numpy as np
+from . import audio_lib  # noqa: F401  (puts "Audio to text" on sys.path)
+
+router = APIRouter(prefix="/convert", tags=["Speech to Text"])
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+LIVE_MODEL_SIZE = os.getenv("LIVE_WHISPER_MODEL", "base")
+
+# Decode again once this much new audio has arrived
+STEP_SECONDS = float(os.getenv("LIVE_STEP_SECONDS", "1.0"))
+# The window is never decoded longer than this, which bounds decode time
+# and therefore latency; older text is finalised to make room
+MAX_WINDOW_SECONDS = float(os.getenv("LIVE_MAX_WINDOW_SECONDS", "15"))
+# Segments ending this close to the live edge may still change
+HOLDBACK_SECONDS = 1.0
+# Finalised text fed back as context for the next window
+PROMPT_CHARS = 200
+
+_transcriber = None
+
+
+def get_transcriber():
+    global _transcriber
+    if _transcriber is None:
+        from Aduio2text import WhisperTranscriber
+
+        _transcriber = WhisperTranscriber(model_size=LIVE_MODEL_SIZE, cache=None)
+    return _transcriber
+
+
+class LiveSession:
+    """
+    Audio not yet finalised, plus timing needed to place it on the
+    session timeline and to measure latency.
+    """
+
+    def __init__(self):
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0.0         # session time of buffer[0], seconds
+        self.received_samples = 0
+        self.decoded_samples = 0        # received_samples at the last decode
+        self.last_audio_at = None       # perf_counter of the newest chunk
+        self.prompt = ""
+        self.latencies_ms = []
+        self.new_audio = asyncio.Event()
+        self.closed = False
+        self.disconnected = False
+
+    def add_pcm(self, data: bytes):
+        # Trailing odd byte would not make a whole int16 sample
+        data = data[: len(data) - len(data) % 2]
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+        self.buffer = np.concatenate([self.buffer, samples])
+        self.received_samples += len(samples)
+        self.last_audio_at = time.perf_counter()
+
+        if self.pending_samples() >= STEP_SECONDS * SAMPLE_RATE:
+            self.new_audio.set()
+
+    def pending_samples(self) -> int:
+        return self.received_samples - self.decoded_samples
+
+    def latency_summary(self) -> dict:
+        if not self.latencies_ms:
+            return {"count": 0}
+        values = np.array(self.latencies_ms)
+        return {
+            "count": len(values),
+            "p50_ms": round(float(np.percentile(values, 50)), 1),
+            "p95_ms": round(float(np.percentile(values, 95)), 1),
+            "max_ms": round(float(values.max()), 1),
+        }
+
+
+def shift_segment(segment: dict, offset: float) -> dict:
+    return {
+        "start": round(segment["start"] + offset, 3),
+        "end": round(segment["end"] + offset, 3),
+        "text": segment["text"],
+        "words": [
+            {**word, "start": round(word["start"] + offset, 3), "end": round(word["end"] + offset, 3)}
+            for word in segment["words"]
+        ],
+    }
+
+
+def stable_prefix(segments: list, window_seconds: float, final: bool) -> list:
+    """
+    Leading segments that will not change when more audio arrives.
+    """
+    if final:
+        return segments
+
+    stable = []
+    for segment in segments[:-1]:
+        if segment["end"] > window_seconds - HOLDBACK_SECONDS:
+            break
+        stable.append(segment)
+
+    # Window is full: finalise what we have so it cannot keep growing
+    if not stable and window_seconds >= MAX_WINDOW_SECONDS:
+        stable = segments[:-1] or segments
+    return stable
+
+
+async def decode_step(websocket: WebSocket, session: LiveSession, transcriber, language: str, final: bool = False):
+    audio = session.buffer
+    offset = session.buffer_start
+    audio_at = session.last_audio_at
+    session.decoded_samples = session.received_samples
+
+    result = await asyncio.to_thread(
+        transcriber.transcribe_array,
+        audio,
+        language=language,
+        verbose=None,
+        condition_on_previous_text=False,
+        initial_prompt=session.prompt or None,
+    )
+
+    window_seconds = len(audio) / SAMPLE_RATE
+    segments = result["segments"]
+    stable = stable_prefix(segments, window_seconds, final)
+    latency_ms = round((time.perf_counter() - audio_at) * 1000, 1) if audio_at else 0.0
+    session.latencies_ms.append(latency_ms)
+
+    for segment in stable:
+        await websocket.send_json({
+            "type": "final",
+            **shift_segment(segment, offset),
+            "latency_ms": latency_ms,
+        })
+
+    if stable:
+        # Drop finalised audio; anything appended meanwhile stays at the end
+        cut = stable[-1]["end"]
+        session.buffer = session.buffer[int(cut * SAMPLE_RATE):]
+        session.buffer_start += cut
+        session.prompt = (session.prompt + "".join(s["text"] for s in stable))[-PROMPT_CHARS:]
+    elif not segments and not final and window_seconds >= MAX_WINDOW_SECONDS:
+        # A full window with no speech (silence): nothing to finalise, but
+        # the window still has to shrink. Keep the tail in case a word starts there.
+        cut = window_seconds - HOLDBACK_SECONDS
+        session.buffer = session.buffer[int(cut * SAMPLE_RATE):]
+        session.buffer_start += cut
+
+    pending = segments[len(stable):]
+    if pending and not final:
+        await websocket.send_json({
+            "type": "partial",
+            "start": round(pending[0]["start"] + offset, 3),
+            "text": "".join(s["text"] for s in pending),
+            "latency_ms": latency_ms,
+        })
+
+
+async def receive_audio(websocket: WebSocket, session: LiveSession):
+    """
+    Binary frames are 16 kHz mono s16le PCM; the text frame "end" closes
+    the stream and flushes the remaining text.
+    """
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                session.disconnected = True
+                break
+            if message.get("bytes"):
+                session.add_pcm(message["bytes"])
+            elif message.get("text", "").strip().lower() == "end":
+                break
+    except WebSocketDisconnect:
+        session.disconnected = True
+    finally:
+        session.closed = True
+        session.new_audio.set()
+
+
+@router.websocket("/live")
+async def live_transcription(websocket: WebSocket, language: str = None):
+    await websocket.accept()
+    transcriber = await asyncio.to_thread(get_transcriber)
+
+    session = LiveSession()
+    receiver = asyncio.create_task(receive_audio(websocket, session))
+
+    try:
+        while True:
+            await session.new_audio.wait()
+            session.new_audio.clear()
+            if session.closed:
+                break
+            if session.pending_samples() >= STEP_SECONDS * SAMPLE_RATE:
+                await decode_step(websocket, session, transcriber, language)
+
+        if session.disconnected:
+            return
+
+        if len(session.buffer):
+            await decode_step(websocket, session, transcriber, language, final=True)
+        await websocket.send_json({"type": "done", "latency": session.latency_summary()})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        session.disconnected = True
+
+    except Exception:
+        logger.exception("Live transcription failed")
+        if not session.disconnected:
+            await websocket.close(code=1011)
+
+    finally:
+        receiver.cancel()
+        logger.info("Live session latency: %s", session.latency_summary())
@@ -0,0 +1,11 @@
+"""
+Makes the shared LLM helpers in "LLM integration" (response cache, ...)
+importable from the API routers. Import this before importing them.
+"""
+import sys
+from pathlib import Path
+
+LLM_LIB_DIR = Path(__file__).resolve().parents[2] / "LLM integration"
+
+if str(LLM_LIB_DIR) not in sys.path:
+    sys.path.insert(0, str(LLM_LIB_DIR))
@@ -1,16 +1,56 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from .convert import router as convert_router
 from .generate_info import router as generate_info_router
+from .live_transcribe import router as live_transcribe_router
+from . import audio_lib  # noqa: F401  (puts "Audio to text" on sys.path)
+from . import llm_lib  # noqa: F401
+import llm_client
+import llm_metrics
 import os
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Comma separated Whisper model sizes to load before serving, e.g. "base,small"
+WHISPER_PRELOAD_MODELS = [
+    size.strip() for size in os.getenv("WHISPER_PRELOAD_MODELS", "").split(",") if size.strip()
+]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled OpenAI client for the whole app
+    await llm_client.startup()
+
+    if WHISPER_PRELOAD_MODELS:
+        import model_registry
+
+        # Load in a thread so the loop stays free; first request is then warm.
+        # Same backend and threads WhisperTranscriber will ask for.
+        await asyncio.to_thread(
+            model_registry.preload,
+            WHISPER_PRELOAD_MODELS,
+            backend=os.getenv("WHISPER_BACKEND", "torch"),
+            threads=int(os.getenv("WHISPER_CPU_THREADS", "0")),
+        )
+        for entry in model_registry.stats():
+            logger.info("Whisper model ready: %s", entry)
+    yield
+    await llm_client.shutdown()
+
+
 app = FastAPI(
     title="Audio Processing Pipeline",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -26,3 +66,18 @@ app.add_middleware(
 
 app.include_router(convert_router)
 app.include_router(generate_info_router)
+app.include_router(live_transcribe_router)
+
+
+@app.get("/models")
+def loaded_models():
+    # Preloaded models and any loaded lazily by requests since
+    import model_registry
+
+    return {"models": model_registry.stats()}
+
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus scrape endpoint for LLM call latency, tokens and cost
+    return Response(llm_metrics.metrics.render(), media_type=llm_metrics.CONTENT_TYPE)
@@ -1,10 +1,19 @@
 from dotenv import load_dotenv
 import os
 import json
+import asyncio
+from typing import Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from openai import OpenAI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from . import llm_lib  # noqa: F401  (puts "LLM integration" on sys.path)
+import json_repair
+import llm_client
+import llm_metrics
+import llm_router
+import rate_limiter
+import response_cache
+import single_flight
 
 router = APIRouter(
     prefix="/info",
@@ -20,21 +29,46 @@ load_dotenv()
 
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
-    raise RuntimeError("GEMINI_API_KEY not found in environment")
-
-client = OpenAI(api_key=api_key)
-
-
-@router.post("/generate")
-def generate(text: UserInput):
-    try:
-        subtitle = text.subtitle.strip()
-        category = text.category.strip()
-        if not subtitle and category:
-            raise ValueError("Subtitle Or Category is missing")
-
-        prompt = f"""
-       You are a senior instructional content writer and sports coaching analyst.
+    raise RuntimeError("OPENAI_API_KEY not found in environment")
+
+
+# Skills the model may return, per category
+SKILLS_BY_CATEGORY = {
+    "Mental Resilience": ["Mental Skills and Conditioning"],
+    "Nutrition": ["Hydration", "Meal Planning", "Recovery Nutrition", "Supplements", "General Nutrition"],
+    "Strength": ["Fitness", "Warm-up"],
+    "Tactics": ["Strategy"],
+    "Technique": ["Batting", "Bowling", "Fielding", "Wicket Keeping", "Captaincy"],
+}
+SKILL_LEVELS = ["Beginner", "Easy", "Intermediate", "Advanced", "Expert"]
+# Example answers shown to the model for multi-skill categories
+SKILL_EXAMPLES = {
+    "Nutrition": '["Hydration", "Meal Planning"] or ["General Nutrition"]',
+    "Strength": '["Fitness"] or ["Warm-up"] or ["Fitness", "Warm-up"]',
+    "Technique": '["Batting"] or ["Batting", "Fielding"] or ["Wicket Keeping"]',
+}
+
+
+def render_skill_table() -> str:
+    lines = []
+    for category, skills in SKILLS_BY_CATEGORY.items():
+        lines.append(f'If category = "{category}":')
+        if len(skills) == 1:
+            lines.append(f"  ONLY allowed skill: {json.dumps(skills)}")
+            lines.append(f"  You MUST return exactly: {json.dumps(skills)}")
+        else:
+            lines.append(f"  ONLY allowed skills: {json.dumps(skills)}")
+            lines.append("  Select 1 or more skills from this list based on subtitle content")
+            if category in SKILL_EXAMPLES:
+                lines.append(f"  Example: {SKILL_EXAMPLES[category]}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+# Everything that does not depend on the request. Built once at import and
+# sent byte-for-byte identical first, so provider-side prompt caching can
+# reuse it; per-request data only goes after it.
+PROMPT_PREFIX = """You are a senior instructional content writer and sports coaching analyst.
 
 Your task is to transform raw video subtitles into high-quality educational metadata suitable for a professional learning or training platform.
 
@@ -66,45 +100,22 @@ Maintain a calm, confident coaching tone
 Do NOT repeat the title verbatim
 
 - Skills
-CRITICAL: The user provides a category: "{category}"
-You MUST select skills ONLY from the allowed list for this specific category.
+CRITICAL: The user provides a category in the CATEGORY section at the end.
+You MUST select skills ONLY from the allowed list for that specific category.
 NEVER create new skills. NEVER use skills from other categories. NEVER hallucinate.
 
 ALLOWED SKILLS BY CATEGORY:
 
-If category = "Mental Resilience":
-  ONLY allowed skill: ["Mental Skills and Conditioning"]
-  You MUST return exactly: ["Mental Skills and Conditioning"]
-
-If category = "Nutrition":
-  ONLY allowed skills: ["Hydration", "Meal Planning", "Recovery Nutrition", "Supplements", "General Nutrition"]
-  Select 1 or more skills from this list based on subtitle content
-  Example: ["Hydration", "Meal Planning"] or ["General Nutrition"]
-
-If category = "Strength":
-  ONLY allowed skills: ["Fitness", "Warm-up"]
-  Select 1 or more skills from this list based on subtitle content
-  Example: ["Fitness"] or ["Warm-up"] or ["Fitness", "Warm-up"]
-
-If category = "Tactics":
-  ONLY allowed skill: ["Strategy"]
-  You MUST return exactly: ["Strategy"]
-
-If category = "Technique":
-  ONLY allowed skills: ["Batting", "Bowling", "Fielding", "Wicket Keeping", "Captaincy"]
-  Select 1 or more skills from this list based on subtitle content
-  Example: ["Batting"] or ["Batting", "Fielding"] or ["Wicket Keeping"]
-
+""" + render_skill_table() + """
 STRICT ENFORCEMENT:
-The category provided is: "{category}"
-You can ONLY choose from the skills listed above for "{category}"
-If the subtitle mentions multiple aspects, you may select multiple skills, but ONLY from the allowed list for "{category}"
+You can ONLY choose from the skills listed above for the provided category
+If the subtitle mentions multiple aspects, you may select multiple skills, but ONLY from the allowed list for that category
 DO NOT invent skills like "Bat Control", "Hand Placement", "Coordination", or any other skill not in the allowed list
 If unsure which specific skills to pick, select the most general or relevant one from the allowed list
 
 - Skill Level
 Choose EXACTLY ONE:
-Beginner, Easy, Intermediate, Advanced, Expert
+""" + ", ".join(SKILL_LEVELS) + '''
 
 
 OUTPUT FORMAT
@@ -112,12 +123,19 @@ OUTPUT FORMAT
 Return EXACTLY this JSON structure and fill in the values.
 Do not add, remove, or repeat keys.
 
-{{
+{
 "content_title": "string",
 "description": "string",
 "skill": ["string"],
-"skill_level": "Beginner | Easy | Intermediate | Advanced | Expert"
-}}
+"skill_level": "''' + " | ".join(SKILL_LEVELS) + '''"
+}
+'''
+
+
+def build_prompt(subtitle: str, category: str) -> str:
+    return PROMPT_PREFIX + f"""
+CATEGORY
+{category}
 
 SUBTITLE
 {subtitle}
@@ -126,25 +144,92 @@ CRITICAL FINAL REMINDER - READ BEFORE GENERATING:
 1. Category is: "{category}"
 2. For "skill" field: ONLY use skills from the allowed list for category "{category}"
 3. DO NOT create, invent, or hallucinate ANY skills
-
-        """
-
-        response = client.responses.create(
-            model="gpt-4o",
-            input=prompt,
+"""
+
+
+GENERATE_MODEL = "gpt-4o"
+PROMPT_VERSION = response_cache.prompt_version(build_prompt("{subtitle}", "{category}"))
+
+generate_cache = response_cache.create_response_cache("info-generate")
+repair_stats = json_repair.RepairStats()
+# Identical requests in flight at the same time share one LLM call
+generate_flight = single_flight.SingleFlight()
+
+# OpenAI first; Gemini hedges slow calls and takes over when OpenAI is failing
+llm = llm_router.create_llm_router(llm_client.get_openai_client, GENERATE_MODEL)
+
+# Unknown categories are checked against every skill the prompt lists
+ALL_SKILLS = [skill for skills in SKILLS_BY_CATEGORY.values() for skill in skills]
+
+
+def metadata_schema(category: str) -> json_repair.MetadataSchema:
+    return json_repair.MetadataSchema(
+        title_key="content_title",
+        skill_key="skill",
+        skill_levels=SKILL_LEVELS,
+        allowed_skills=SKILLS_BY_CATEGORY.get(category, ALL_SKILLS),
+    )
+
+
+async def generate_metadata(subtitle: str, category: str,
+                            priority: int = rate_limiter.PRIORITY_INTERACTIVE) -> dict:
+    """
+    Metadata for one subtitle. Raises ValueError for bad input or unusable
+    model output and RateLimited when upstream budget ran out; anything else
+    is a server-side failure.
+    """
+    subtitle = subtitle.strip()
+    category = category.strip()
+    if not subtitle and category:
+        raise ValueError("Subtitle Or Category is missing")
+
+    # Same subtitle and category already tagged with this prompt and model
+    cache_key = response_cache.make_key(subtitle, category, GENERATE_MODEL, PROMPT_VERSION)
+    cached = await generate_cache.aget(cache_key)
+    if cached is not None:
+        return cached["response"]
+
+    # Keyed like the cache, so normalised duplicates wait for one call
+    return await generate_flight.do(
+        cache_key, lambda: generate_uncached(subtitle, category, cache_key, priority)
+    )
+
+
+async def generate_uncached(subtitle: str, category: str, cache_key: str, priority: int) -> dict:
+    prompt = build_prompt(subtitle, category)
+
+    completion = await llm.complete(prompt, route="/info/generate", priority=priority)
+    llm_metrics.log_prompt_usage(completion, "/info/generate")
+    # Models that contributed to the answer, hedge and failover included
+    models = {completion.model}
+
+    async def ask_for_fix(fix_prompt: str):
+        fix = await llm.complete(fix_prompt, route="/info/generate:repair", priority=priority)
+        llm_metrics.log_prompt_usage(fix, "/info/generate (repair)")
+        models.add(fix.model)
+        return fix
+
+    # Fixes what it can locally; re-asks only for fields still invalid
+    parsed_output, extra_in, extra_out = await json_repair.repair_output(
+        metadata_schema(category), subtitle, completion.text, ask_for_fix, stats=repair_stats
+    )
+
+    # The key names GENERATE_MODEL; an answer from the fallback provider
+    # would otherwise be served as its own for the whole TTL
+    if models == {GENERATE_MODEL}:
+        await generate_cache.aset(
+            cache_key,
+            parsed_output,
+            input_tokens=completion.input_tokens + extra_in,
+            output_tokens=completion.output_tokens + extra_out,
         )
+    return parsed_output
 
-        if not response or not response.output_text:
-            raise RuntimeError("Empty response from Gemini")
 
-        llm_text = response.output_text.strip()
-
-        try:
-            parsed_output = json.loads(llm_text)
-        except json.JSONDecodeError as e:
-            raise ValueError(
-                f"Invalid JSON returned by LLM: {llm_text}"
-            ) from e
+@router.post("/generate")
+async def generate(text: UserInput):
+    try:
+        parsed_output = await generate_metadata(text.subtitle, text.category)
 
         return {
             "response": parsed_output
@@ -163,6 +248,20 @@ CRITICAL FINAL REMINDER - READ BEFORE GENERATING:
                 }  
         )
 
+    except rate_limiter.RateLimited as rl:
+        # Upstream budget exhausted: tell the client when to retry
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": str(max(1, round(rl.retry_after)))},
+            content={
+                "status": 0,
+                "message": "Too many requests. Please retry later",
+                "errors": {
+                    "title": [str(rl)]
+                }
+            }
+        )
+
     except Exception as e: 
         # Catch EVERYTHING else so server never crashes
         return JSONResponse(
@@ -176,3 +275,87 @@ CRITICAL FINAL REMINDER - READ BEFORE GENERATING:
             }
           
         )
+
+
+class BatchInput(BaseModel):
+    items: list[UserInput]
+    concurrency: Optional[int] = None
+
+
+# Upper bound on simultaneous LLM calls for one batch request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+MAX_BATCH_CONCURRENCY = int(os.getenv("MAX_BATCH_CONCURRENCY", "32"))
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "5000"))
+
+
+async def run_batch_item(index: int, item: UserInput, slots: asyncio.Semaphore) -> dict:
+    async with slots:
+        try:
+            parsed_output = await generate_metadata(
+                item.subtitle, item.category, rate_limiter.PRIORITY_BATCH
+            )
+            return {"index": index, "status": 1, "response": parsed_output}
+
+        except ValueError as ve:
+            return {"index": index, "status": 0, "code": 400, "errors": {"title": [str(ve)]}}
+
+        except rate_limiter.RateLimited as rl:
+            return {
+                "index": index, "status": 0, "code": 429,
+                "retry_after": rl.retry_after, "errors": {"title": [str(rl)]},
+            }
+
+        except Exception as e:
+            return {"index": index, "status": 0, "code": 500, "errors": {"title": [str(e)]}}
+
+
+async def stream_batch(items: list, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.create_task(run_batch_item(index, item, slots))
+        for index, item in enumerate(items)
+    ]
+    try:
+        # One NDJSON line per item, in the order they finish
+        for finished in asyncio.as_completed(tasks):
+            yield json.dumps(await finished) + "\n"
+    finally:
+        # Client went away: stop the calls that have not finished
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/generate/batch")
+async def generate_batch(batch: BatchInput):
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": 0,
+                "message": "Validation failed. Please check your input",
+                "errors": {
+                    "title": [f"Batch exceeds {MAX_BATCH_ITEMS} items"]
+                }
+            }
+        )
+
+    concurrency = min(batch.concurrency or BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY)
+    return StreamingResponse(
+        stream_batch(batch.items, max(1, concurrency)),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    return {**generate_cache.stats(), "single_flight": generate_flight.stats()}
+
+
+@router.get("/repair/stats")
+def repair_stats_view():
+    return repair_stats.stats()
+
+
+@router.get("/llm/stats")
+def llm_stats():
+    return llm.stats()
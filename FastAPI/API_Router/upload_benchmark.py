@@ -0,0 +1,138 @@
+"""
+Worker memory while N large uploads hit /convert/speech2text at once.
+
+    python -m FastAPI.API_Router.upload_benchmark --uploads 8 --size-mb 300
+
+Sends the same on-disk WAV file as N concurrent multipart uploads, first to
+the real route (chunked copy to disk) and then to a copy of the old route
+that did `await file.read()` before writing. AssemblyAI is swapped for a
+local fake, so only the upload path is measured. Peak RSS above the
+starting level is sampled from /proc while each run is in flight; the
+chunked route should stay flat while the buffered one grows by roughly
+N x the file size.
+"""
+import argparse
+import asyncio
+import os
+import struct
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("ASSEMBLY_API_KEY", "benchmark")
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from . import Page2
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+class PeakSampler:
+    """Highest RSS seen between start() and stop(), polled from a thread."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def start(self):
+        self.peak = rss_bytes()
+        self._thread.start()
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        return self.peak
+
+
+def write_wav(path: str, size_mb: int):
+    """16 kHz mono s16le WAV of about size_mb, written in 1 MB blocks."""
+    data_bytes = size_mb * 1024 * 1024
+    header = b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE"
+    header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, 16000, 32000, 2, 16)
+    header += b"data" + struct.pack("<I", data_bytes)
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        f.write(header)
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def fake_transcribe(path: str) -> str:
+    return f"fake transcript of {os.path.getsize(path)} bytes"
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(Page2.router)
+
+    @app.post("/buffered/speech2text")
+    async def buffered_upload(file: UploadFile = File(...)):
+        # The route before chunked copying: whole body in memory, then to disk
+        content = await file.read()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+            tmp.write(content)
+        Page2.remove_temp_file(tmp.name)
+        return {"size": len(content)}
+
+    return app
+
+
+async def upload_all(client: httpx.AsyncClient, url: str, path: str, n: int) -> list:
+    async def one(i: int):
+        with open(path, "rb") as f:
+            response = await client.post(url, files={"file": (f"match{i}.wav", f, "audio/wav")})
+        assert response.status_code in (200, 202), response.text
+        return response.json()
+
+    return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+async def run(client: httpx.AsyncClient, label: str, url: str, path: str, n: int, size_mb: int):
+    baseline = rss_bytes()
+    sampler = PeakSampler()
+    sampler.start()
+    started = time.perf_counter()
+    await upload_all(client, url, path, n)
+    # Let the queued jobs finish and delete their temp files
+    while Page2._running_tasks:
+        await asyncio.sleep(0.01)
+    seconds = time.perf_counter() - started
+    growth = (sampler.stop() - baseline) / (1024 * 1024)
+    print(f"{label:<10s} {n:3d} x {size_mb} MB  {seconds:6.1f}s  peak RSS +{growth:8.1f} MB")
+
+
+async def main(uploads: int, size_mb: int):
+    Page2.transcribe_backend = fake_transcribe
+    # Every run uploads the same bytes; keep the cache from answering
+    Page2.transcript_store = None
+    Page2.MAX_UPLOAD_BYTES = max(Page2.MAX_UPLOAD_BYTES, (size_mb + 1) * 1024 * 1024)
+
+    transport = httpx.ASGITransport(app=build_app())
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "match.wav")
+        write_wav(path, size_mb)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await run(client, "chunked", "/convert/speech2text", path, uploads, size_mb)
+            await run(client, "buffered", "/buffered/speech2text", path, uploads, size_mb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.uploads, args.size_mb))
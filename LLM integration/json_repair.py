@@ -0,0 +1,265 @@
+import json
+import re
+import threading
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+
+
+def _first_wins(pairs: list) -> dict:
+    """
+    object_pairs_hook: on a repeated key keep the first non-empty value,
+    which is what the model meant before it started repeating itself.
+    """
+    result = {}
+    for key, value in pairs:
+        if key not in result or result[key] in (None, "", [], {}):
+            result[key] = value
+    return result
+
+
+def _balanced_object(text: str, start: int) -> str:
+    """
+    The {...} starting at text[start], matched by brace depth outside strings.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def extract_json_object(text: str) -> dict:
+    """
+    First JSON object in model output, tolerating code fences, prose before
+    or after it, and duplicate keys. Raises ValueError if there is none.
+    """
+    text = (text or "").strip()
+    candidates = [m.group(1) for m in FENCE_RE.finditer(text)] + [text]
+
+    for candidate in candidates:
+        start = candidate.find("{")
+        while start != -1:
+            block = _balanced_object(candidate, start)
+            if block is None:
+                break
+            try:
+                value = json.loads(block, object_pairs_hook=_first_wins)
+                if isinstance(value, dict):
+                    return value
+            except json.JSONDecodeError:
+                pass
+            start = candidate.find("{", start + 1)
+
+    raise ValueError(f"Invalid JSON returned by LLM: {text}")
+
+
+def _canonical(value, allowed: list):
+    """
+    Allowed spelling of value, ignoring case and surrounding whitespace.
+    """
+    if not isinstance(value, str):
+        return None
+    lookup = {item.casefold(): item for item in allowed}
+    return lookup.get(value.strip().casefold())
+
+
+class MetadataSchema:
+    """
+    Expected shape of a generated metadata object and the local fixes that
+    can be applied without asking the model again.
+    """
+
+    def __init__(
+        self,
+        title_key: str,
+        skill_key: str,
+        skill_levels: list,
+        allowed_skills: list = None,
+        allowed_tags: list = None,
+        tag_count: int = None,
+    ):
+        self.title_key = title_key
+        self.skill_key = skill_key
+        self.skill_levels = skill_levels
+        self.allowed_skills = allowed_skills
+        self.allowed_tags = allowed_tags
+        self.tag_count = tag_count
+
+    def _clean_list(self, values, allowed: list) -> list:
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list):
+            return []
+        cleaned = []
+        for value in values:
+            value = _canonical(value, allowed) if allowed else (value.strip() if isinstance(value, str) else None)
+            if value and value not in cleaned:
+                cleaned.append(value)
+        return cleaned
+
+    def normalise(self, data: dict) -> dict:
+        """
+        Fix casing, drop disallowed or repeated list entries, strip strings.
+        """
+        data = dict(data)
+        for key in (self.title_key, "description"):
+            if isinstance(data.get(key), str):
+                data[key] = data[key].strip()
+
+        data[self.skill_key] = self._clean_list(data.get(self.skill_key), self.allowed_skills)
+
+        level = _canonical(data.get("skill_level"), self.skill_levels)
+        if level:
+            data["skill_level"] = level
+
+        if self.allowed_tags is not None:
+            tags = self._clean_list(data.get("tags"), self.allowed_tags)
+            data["tags"] = tags[: self.tag_count] if self.tag_count else tags
+        return data
+
+    def validate(self, data: dict) -> dict:
+        """
+        field -> what is wrong with it; empty when the object is usable.
+        """
+        problems = {}
+        for key in (self.title_key, "description"):
+            if not isinstance(data.get(key), str) or not data[key]:
+                problems[key] = "missing or empty string"
+
+        if not data.get(self.skill_key):
+            problems[self.skill_key] = "needs at least one allowed skill"
+
+        if data.get("skill_level") not in self.skill_levels:
+            problems["skill_level"] = f"must be one of {self.skill_levels}"
+
+        if self.allowed_tags is not None:
+            tags = data.get("tags") or []
+            if self.tag_count and len(tags) != self.tag_count:
+                problems["tags"] = f"needs exactly {self.tag_count} allowed tags, has {len(tags)} valid"
+        return problems
+
+    def fix_prompt(self, subtitle: str, data: dict, problems: dict, candidate_tags: list = None) -> str:
+        """
+        Small follow-up asking only for the fields that failed validation.
+        """
+        lines = [
+            "You previously generated metadata for the subtitle below, but some fields were invalid.",
+            "Return ONLY a JSON object containing exactly these keys, with corrected values:",
+        ]
+        for key, problem in problems.items():
+            lines.append(f"- {key}: {problem}")
+
+        if self.skill_key in problems and self.allowed_skills:
+            lines.append(f"Allowed {self.skill_key} values: {json.dumps(self.allowed_skills)}")
+        if "tags" in problems and self.allowed_tags is not None:
+            kept = data.get("tags") or []
+            lines.append(f"Keep these valid tags: {json.dumps(kept)} and add more to reach {self.tag_count}.")
+            lines.append(f"Allowed tags: {', '.join(candidate_tags or self.allowed_tags)}")
+
+        lines.append("")
+        lines.append("Current (partly invalid) output:")
+        lines.append(json.dumps(data, ensure_ascii=False))
+        lines.append("")
+        lines.append("SUBTITLE")
+        lines.append(subtitle)
+        return "\n".join(lines)
+
+    def merge_fix(self, data: dict, fix: dict, problems: dict) -> dict:
+        merged = dict(data)
+        for key in problems:
+            if key in fix:
+                merged[key] = fix[key]
+        if "tags" in problems and isinstance(merged.get("tags"), list):
+            # The model was asked to keep the valid tags; make sure they stay
+            merged["tags"] = (data.get("tags") or []) + merged["tags"]
+        return self.normalise(merged)
+
+
+class RepairStats:
+    """
+    How often output needed local repair or a follow-up call, and what the
+    follow-ups cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.repaired_locally = 0
+        self.followups = 0
+        self.followup_input_tokens = 0
+        self.followup_output_tokens = 0
+        self.failed = 0
+
+    def record(self, repaired_locally: bool = False, followup_usage: tuple = None, failed: bool = False):
+        with self._lock:
+            self.responses += 1
+            self.repaired_locally += repaired_locally
+            self.failed += failed
+            if followup_usage is not None:
+                self.followups += 1
+                self.followup_input_tokens += followup_usage[0]
+                self.followup_output_tokens += followup_usage[1]
+
+    def stats(self) -> dict:
+        return {
+            "responses": self.responses,
+            "repaired_locally": self.repaired_locally,
+            "followups": self.followups,
+            "retry_rate": round(self.followups / self.responses, 4) if self.responses else 0.0,
+            "followup_input_tokens": self.followup_input_tokens,
+            "followup_output_tokens": self.followup_output_tokens,
+            "failed": self.failed,
+        }
+
+
+async def repair_output(schema: MetadataSchema, subtitle: str, llm_text: str, complete,
+                        stats: RepairStats = None, candidate_tags: list = None) -> tuple:
+    """
+    Parse and validate model output, fixing what can be fixed locally and
+    re-asking only for the fields that are still invalid. complete is an
+    async callable taking the follow-up prompt and returning a completion
+    with text, input_tokens and output_tokens.
+    Returns (metadata, extra_input_tokens, extra_output_tokens); raises
+    ValueError when the output cannot be used.
+    """
+    stats = stats or RepairStats()
+    try:
+        raw = extract_json_object(llm_text)
+    except ValueError:
+        stats.record(failed=True)
+        raise
+    data = schema.normalise(raw)
+    problems = schema.validate(data)
+    if not problems:
+        stats.record(repaired_locally=data != raw)
+        return data, 0, 0
+
+    completion = await complete(schema.fix_prompt(subtitle, data, problems, candidate_tags=candidate_tags))
+    extra = (completion.input_tokens, completion.output_tokens)
+
+    try:
+        fix = extract_json_object(completion.text)
+    except ValueError:
+        fix = {}
+    data = schema.merge_fix(data, fix, problems)
+    problems = schema.validate(data)
+    stats.record(followup_usage=extra, failed=bool(problems))
+    if problems:
+        raise ValueError(f"LLM output failed validation: {problems}")
+    return data, *extra
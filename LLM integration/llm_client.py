@@ -0,0 +1,85 @@
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+# Connection pool shared by every OpenAI call in the process. A streamed
+# completion holds its connection for the whole generation, so the pool
+# also bounds concurrent streams.
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+
+# Completions take seconds; connecting should not
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", "60"))
+
+_client = None
+
+
+def create_openai_client() -> AsyncOpenAI:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not found in environment")
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(OPENAI_REQUEST_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    )
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        http_client=http_client,
+        # No SDK retries: every call goes through rate_limiter.scheduler, which
+        # must see each 429 to pause and back off, and must count every
+        # upstream attempt against the RPM/TPM budget
+        max_retries=0,
+        timeout=httpx.Timeout(OPENAI_REQUEST_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    )
+
+
+async def startup():
+    """
+    Create the shared client; called from the app lifespan.
+    """
+    global _client
+    if _client is None:
+        _client = create_openai_client()
+
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    For routers that are mounted without an app lifespan of their own:
+    APIRouter(lifespan=llm_client.lifespan). FastAPI merges it into the
+    app's, so the pool is closed on shutdown.
+    """
+    await startup()
+    yield
+    await shutdown()
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    The shared client. Falls back to creating it on first use when the
+    router is mounted in an app without our lifespan.
+    """
+    global _client
+    if _client is None:
+        _client = create_openai_client()
+    return _client
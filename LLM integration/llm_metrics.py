@@ -0,0 +1,195 @@
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gemini-2.5-flash": (0.30, 0.03, 2.50),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+    "gemini-3-pro-preview": (2.00, 0.20, 12.00),
+}
+
+# Upper bounds in seconds
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, float("inf"))
+QUEUE_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, float("inf"))
+
+
+def compute_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """
+    Cost in USD; 0 for models without a price. cached_tokens is the part
+    of input_tokens billed at the cached rate.
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    uncached = max(0, input_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+
+
+def log_prompt_usage(completion, route: str):
+    """
+    Prompt tokens and how many of them the provider served from its cache.
+    """
+    logger.info(
+        "%s provider=%s prompt_tokens=%s cached_tokens=%s (%.0f%%) output_tokens=%s",
+        route,
+        completion.provider,
+        completion.input_tokens,
+        completion.cached_tokens,
+        100.0 * completion.cached_tokens / completion.input_tokens if completion.input_tokens else 0.0,
+        completion.output_tokens,
+    )
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return ",".join(pairs)
+
+
+class LLMMetrics:
+    """
+    Counters and histograms for LLM calls, labelled by route, provider and
+    model, rendered in Prometheus text format.
+    """
+
+    CALL_LABELS = ("route", "provider", "model")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}      # (route, provider, model, status) -> count
+        self.tokens = {}        # (route, provider, model, type) -> count
+        self.cost = {}          # (route, provider, model) -> USD
+        self.duration = {}      # (route, provider, model) -> [bucket counts, sum]
+        self.ttft = {}
+        self.queue_wait = {}    # (provider, model, priority) -> [bucket counts, sum]
+        self.rejections = {}    # (provider, model, reason) -> count
+
+    @staticmethod
+    def _observe(histograms: dict, key: tuple, seconds: float, buckets: tuple = DURATION_BUCKETS):
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [[0] * len(buckets), 0.0]
+        entry[0][bisect.bisect_left(buckets, seconds)] += 1
+        entry[1] += seconds
+
+    def record_call(self, route: str, provider: str, model: str, seconds: float, status: str = "ok",
+                    ttft: float = None, input_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0):
+        key = (route, provider, model)
+        with self._lock:
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            self._observe(self.duration, key, seconds)
+            if ttft is not None:
+                self._observe(self.ttft, key, ttft)
+            for kind, count in (("input", input_tokens), ("output", output_tokens), ("cached", cached_tokens)):
+                if count:
+                    self.tokens[key + (kind,)] = self.tokens.get(key + (kind,), 0) + count
+            cost = compute_cost(model, input_tokens, output_tokens, cached_tokens)
+            if cost:
+                self.cost[key] = self.cost.get(key, 0.0) + cost
+
+    def observe_queue_wait(self, provider: str, model: str, priority: int, seconds: float):
+        with self._lock:
+            self._observe(self.queue_wait, (provider, model, priority), seconds, QUEUE_WAIT_BUCKETS)
+
+    def count_rejection(self, provider: str, model: str, reason: str):
+        key = (provider, model, reason)
+        with self._lock:
+            self.rejections[key] = self.rejections.get(key, 0) + 1
+
+    def timer(self, route: str, provider: str, model: str) -> "CallTimer":
+        return CallTimer(self, route, provider, model)
+
+    def _render_histogram(self, lines: list, name: str, help_text: str, histograms: dict,
+                          label_names: tuple = CALL_LABELS, buckets: tuple = DURATION_BUCKETS):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, (counts, total) in histograms.items():
+            labels = _labels(label_names, key)
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP llm_requests_total LLM calls by outcome.",
+                "# TYPE llm_requests_total counter",
+            ]
+            for key, count in self.requests.items():
+                lines.append(f"llm_requests_total{{{_labels(self.CALL_LABELS + ('status',), key)}}} {count}")
+
+            self._render_histogram(lines, "llm_request_duration_seconds", "Total LLM call latency.", self.duration)
+            self._render_histogram(
+                lines, "llm_time_to_first_token_seconds", "Time to first streamed token.", self.ttft
+            )
+
+            lines.append("# HELP llm_tokens_total Tokens by type (cached is a subset of input).")
+            lines.append("# TYPE llm_tokens_total counter")
+            for key, count in self.tokens.items():
+                lines.append(f"llm_tokens_total{{{_labels(self.CALL_LABELS + ('type',), key)}}} {count}")
+
+            lines.append("# HELP llm_cost_usd_total Estimated spend from token counts and MODEL_PRICES.")
+            lines.append("# TYPE llm_cost_usd_total counter")
+            for key, cost in self.cost.items():
+                lines.append(f"llm_cost_usd_total{{{_labels(self.CALL_LABELS, key)}}} {cost:.8f}")
+
+            self._render_histogram(
+                lines, "llm_queue_wait_seconds", "Time waiting for rate-limit budget before the call.",
+                self.queue_wait, ("provider", "model", "priority"), QUEUE_WAIT_BUCKETS,
+            )
+
+            lines.append("# HELP llm_rate_limit_rejections_total Calls refused by the scheduler or upstream.")
+            lines.append("# TYPE llm_rate_limit_rejections_total counter")
+            for key, count in self.rejections.items():
+                labels = _labels(("provider", "model", "reason"), key)
+                lines.append(f"llm_rate_limit_rejections_total{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class CallTimer:
+    """
+    Times one call: started on creation, first_token() marks TTFT for
+    streamed calls, finish()/fail() record it.
+    """
+
+    def __init__(self, metrics: LLMMetrics, route: str, provider: str, model: str):
+        self.metrics = metrics
+        self.route = route
+        self.provider = provider
+        self.model = model
+        self.started = time.perf_counter()
+        self.ttft = None
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def finish(self, input_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0, status: str = "ok"):
+        self.metrics.record_call(
+            self.route, self.provider, self.model, time.perf_counter() - self.started,
+            status=status, ttft=self.ttft, input_tokens=input_tokens,
+            output_tokens=output_tokens, cached_tokens=cached_tokens,
+        )
+
+    def fail(self, status: str = "error"):
+        self.finish(status=status)
+
+
+# Process-wide registry shared by every route
+metrics = LLMMetrics()
@@ -0,0 +1,58 @@
+"""
+Overhead of llm_metrics on the request path and of a /metrics scrape.
+
+    python llm_metrics_benchmark.py --calls 200000 --series 40
+
+A timed call (timer() + finish() with tokens and cost) is compared with an
+empty loop; the per-call difference is the instrumentation cost, shown
+against a 1 s LLM call for scale.
+"""
+import argparse
+import time
+
+from llm_metrics import LLMMetrics
+
+ROUTES = ["/info/generate", "/info/generate:repair", "/generate/summary", "/info/generate/batch"]
+MODELS = [("openai", "gpt-4o"), ("gemini", "gemini-2.5-flash"), ("gemini", "gemini-3-pro-preview"),
+          ("openai", "gpt-4o-mini"), ("fake", "fake")]
+
+
+def labels(series: int) -> list:
+    combos = [(route, provider, model) for route in ROUTES for provider, model in MODELS]
+    return combos[:series]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--series", type=int, default=20, help="distinct route/provider/model label sets")
+    args = parser.parse_args()
+
+    combos = labels(args.series)
+
+    started = time.perf_counter()
+    for i in range(args.calls):
+        route, provider, model = combos[i % len(combos)]
+    baseline = time.perf_counter() - started
+
+    metrics = LLMMetrics()
+    started = time.perf_counter()
+    for i in range(args.calls):
+        route, provider, model = combos[i % len(combos)]
+        timer = metrics.timer(route, provider, model)
+        if i % 4 == 0:
+            timer.first_token()
+        timer.finish(input_tokens=1800, output_tokens=120, cached_tokens=1024)
+    instrumented = time.perf_counter() - started
+
+    per_call_us = (instrumented - baseline) / args.calls * 1e6
+
+    scrapes = 200
+    started = time.perf_counter()
+    for _ in range(scrapes):
+        body = metrics.render()
+    render_ms = (time.perf_counter() - started) / scrapes * 1000
+
+    print(f"{args.calls} calls over {len(combos)} label sets")
+    print(f"  per call overhead:   {per_call_us:8.2f} us  ({per_call_us / 1e6:.6%} of a 1 s LLM call)")
+    print(f"  /metrics render:     {render_ms:8.2f} ms  ({len(body.splitlines())} lines, {len(body) / 1024:.1f} KiB)")
@@ -0,0 +1,437 @@
+import asyncio
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import llm_metrics
+import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Hedge when the primary is slower than this percentile of its recent calls
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "20.0"))
+# Used until a provider has enough samples for a percentile
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "8.0"))
+
+# Circuit breaker: open when the error rate over the last calls is too high
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# Upper bounds in seconds; the last bucket catches everything slower
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, float("inf"))
+
+
+class ProvidersUnavailable(RuntimeError):
+    """
+    Every provider's circuit is open.
+    """
+
+
+class Completion:
+    def __init__(self, text: str, provider: str, model: str, input_tokens: int = 0,
+                 output_tokens: int = 0, cached_tokens: int = 0):
+        self.text = text
+        self.provider = provider
+        self.model = model
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cached_tokens = cached_tokens
+
+
+class OpenAIProvider:
+    """
+    Responses API. get_client is called per request so the shared client
+    created by the app lifespan is picked up.
+    """
+
+    def __init__(self, name: str, get_client, model: str):
+        self.name = name
+        self.get_client = get_client
+        self.model = model
+
+    async def complete(self, prompt: str) -> Completion:
+        response = await self.get_client().responses.create(model=self.model, input=prompt)
+        if not response or not response.output_text:
+            raise RuntimeError(f"Empty response from {self.name}")
+
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "input_tokens_details", None)
+        return Completion(
+            response.output_text.strip(),
+            self.name,
+            self.model,
+            input_tokens=usage.input_tokens if usage else 0,
+            output_tokens=usage.output_tokens if usage else 0,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        )
+
+
+class GeminiProvider:
+    def __init__(self, name: str, model: str, api_key: str):
+        self.name = name
+        self.model = model
+        self.api_key = api_key
+        self._client = None
+
+    async def complete(self, prompt: str) -> Completion:
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client(api_key=self.api_key)
+
+        response = await self._client.aio.models.generate_content(model=self.model, contents=prompt)
+        if not response or not response.text:
+            raise RuntimeError(f"Empty response from {self.name}")
+
+        usage = getattr(response, "usage_metadata", None)
+        return Completion(
+            response.text.strip(),
+            self.name,
+            self.model,
+            input_tokens=(usage.prompt_token_count or 0) if usage else 0,
+            output_tokens=(usage.candidates_token_count or 0) if usage else 0,
+            cached_tokens=(getattr(usage, "cached_content_token_count", 0) or 0) if usage else 0,
+        )
+
+
+class FakeProvider:
+    """
+    Local stand-in for tests and simulations. latency is a number of seconds
+    or a callable returning one; error_rate is the chance a call raises.
+    """
+
+    def __init__(self, name: str, latency=0.05, error_rate: float = 0.0,
+                 text: str = "{}", model: str = "fake"):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.text = text
+        self.model = model
+        self.calls = 0
+
+    async def complete(self, prompt: str) -> Completion:
+        self.calls += 1
+        delay = self.latency() if callable(self.latency) else self.latency
+        await asyncio.sleep(delay)
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"{self.name} failed")
+        return Completion(self.text, self.name, self.model, input_tokens=len(prompt) // 4, output_tokens=len(self.text) // 4)
+
+
+class LatencyHistogram:
+    """
+    Bucketed counts for reporting plus a window of recent samples for the
+    hedge deadline.
+    """
+
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.recent = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+        self.total += 1
+        self.sum += seconds
+
+    def percentile(self, p: float):
+        """
+        p-th percentile of recent samples, or None with too few of them.
+        """
+        if len(self.recent) < self.min_samples:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.total,
+            "mean_s": round(self.sum / self.total, 4) if self.total else 0.0,
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "p99_s": self.percentile(99),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.counts)
+            },
+        }
+
+
+class CircuitBreaker:
+    """
+    closed -> open when the error rate over the last `window` calls reaches
+    error_rate (after min_calls). open -> half-open after cooldown, where a
+    single probe call decides whether to close again.
+    """
+
+    def __init__(self, error_rate: float = LLM_BREAKER_ERROR_RATE, window: int = LLM_BREAKER_WINDOW,
+                 min_calls: int = LLM_BREAKER_MIN_CALLS, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half-open"
+            if self.state == "half-open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record(self, success: bool):
+        with self._lock:
+            if self.state == "open":
+                # Outcome of a call started before the circuit opened
+                return
+            if self.state == "half-open":
+                self.probe_in_flight = False
+                if success:
+                    self.state = "closed"
+                    self.outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.error_rate:
+                self._open()
+
+    def release(self):
+        """
+        A call ended without an outcome (cancelled); free the probe slot.
+        """
+        with self._lock:
+            self.probe_in_flight = False
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+
+class LLMRouter:
+    """
+    Sends a prompt to the first provider whose circuit is closed. If it has
+    not answered by its hedge deadline (a percentile of its own recent
+    latency), the next provider is asked too and the first success wins;
+    the other call is cancelled. A failed call fails over immediately.
+    Every call first waits for rate-limit budget from the scheduler.
+    """
+
+    def __init__(self, providers: list, hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 min_delay: float = LLM_HEDGE_MIN_DELAY, max_delay: float = LLM_HEDGE_MAX_DELAY,
+                 default_delay: float = LLM_HEDGE_DEFAULT_DELAY, breaker_factory=CircuitBreaker,
+                 scheduler: rate_limiter.RateScheduler = None):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = list(providers)
+        self.hedge_percentile = hedge_percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.breakers = {p.name: breaker_factory() for p in self.providers}
+        self.latency = {p.name: LatencyHistogram() for p in self.providers}
+        self.scheduler = scheduler or rate_limiter.RateScheduler()
+        self.counters = {
+            p.name: {"calls": 0, "errors": 0, "rate_limited": 0, "wins": 0, "cancelled": 0}
+            for p in self.providers
+        }
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def hedge_delay(self, provider) -> float:
+        observed = self.latency[provider.name].percentile(self.hedge_percentile)
+        if observed is None:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    async def _call(self, provider, prompt: str, route: str, priority: int) -> Completion:
+        """
+        One provider's answer, within its rate limits. Upstream 429s pause
+        the provider for Retry-After (or a jittered backoff) and retry.
+        The caller has claimed the provider's breaker with allow(); if no
+        outcome gets recorded (cancelled, queue timeout, 429s) it is released.
+        """
+        estimated = rate_limiter.estimate_tokens(prompt)
+        recorded = False
+        try:
+            for attempt in range(rate_limiter.LLM_RATE_LIMIT_RETRIES + 1):
+                await self.scheduler.acquire(provider.name, provider.model, estimated, priority)
+                try:
+                    result = await self._attempt(provider, prompt, route)
+                except Exception as e:
+                    if not rate_limiter.is_rate_limit_error(e):
+                        # _attempt recorded the failure
+                        recorded = True
+                        raise
+                    delay = rate_limiter.backoff_delay(attempt, rate_limiter.retry_after_seconds(e))
+                    self.scheduler.pause(provider.name, provider.model, delay)
+                    if attempt == rate_limiter.LLM_RATE_LIMIT_RETRIES:
+                        raise rate_limiter.RateLimited(f"{provider.name} is rate limiting requests", delay) from e
+                    logger.info("%s returned 429, retrying in %.1fs", provider.name, delay)
+                    continue
+                recorded = True
+                self.scheduler.settle(
+                    provider.name, provider.model, estimated, result.input_tokens + result.output_tokens
+                )
+                return result
+        finally:
+            if not recorded:
+                self.breakers[provider.name].release()
+
+    async def _attempt(self, provider, prompt: str, route: str) -> Completion:
+        counters = self.counters[provider.name]
+        breaker = self.breakers[provider.name]
+        timer = llm_metrics.metrics.timer(route, provider.name, provider.model)
+        counters["calls"] += 1
+        started = time.perf_counter()
+        try:
+            result = await provider.complete(prompt)
+        except asyncio.CancelledError:
+            # Lost the race. Still a lower bound on this provider's latency;
+            # dropping it would pull the percentile (and the deadline) down.
+            counters["cancelled"] += 1
+            self.latency[provider.name].observe(time.perf_counter() - started)
+            timer.fail("cancelled")
+            raise
+        except Exception as e:
+            if rate_limiter.is_rate_limit_error(e):
+                # Backpressure, not a broken provider: leave the breaker alone
+                counters["rate_limited"] += 1
+                timer.fail("rate_limited")
+                raise
+            counters["errors"] += 1
+            breaker.record(False)
+            timer.fail()
+            raise
+        self.latency[provider.name].observe(time.perf_counter() - started)
+        breaker.record(True)
+        timer.finish(result.input_tokens, result.output_tokens, result.cached_tokens)
+        return result
+
+    def _take(self, pool: list):
+        """
+        Pop providers off pool until one's circuit lets a call through.
+        allow() claims a half-open probe, so only ask right before calling.
+        """
+        while pool:
+            provider = pool.pop(0)
+            if self.breakers[provider.name].allow():
+                return provider
+        return None
+
+    async def complete(self, prompt: str, route: str = "unknown",
+                       priority: int = rate_limiter.PRIORITY_INTERACTIVE) -> Completion:
+        """
+        route labels the call in llm_metrics; priority orders it in the
+        rate-limit queue (interactive before batch).
+        """
+        self.requests += 1
+        backups = list(self.providers)
+        primary = self._take(backups)
+        if primary is None:
+            raise ProvidersUnavailable("All LLM providers are unavailable (circuit open)")
+
+        running = {asyncio.create_task(self._call(primary, prompt, route, priority)): primary}
+        deadline = self.hedge_delay(primary)
+        errors = []
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, timeout=deadline if backups else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is in its slow tail: ask the next provider too
+                    provider = self._take(backups)
+                    if provider is None:
+                        continue
+                    self.hedged += 1
+                    logger.info("Hedging LLM request to %s after %.2fs", provider.name, deadline)
+                    running[asyncio.create_task(self._call(provider, prompt, route, priority))] = provider
+                    deadline = self.hedge_delay(provider)
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        self.counters[provider.name]["wins"] += 1
+                        if provider is not primary and len(errors) == 0:
+                            self.hedge_wins += 1
+                        return task.result()
+                    errors.append(task.exception())
+                    logger.warning("LLM provider %s failed: %s", provider.name, task.exception())
+
+                if not running:
+                    provider = self._take(backups)
+                    if provider is None:
+                        break
+                    self.failovers += 1
+                    running[asyncio.create_task(self._call(provider, prompt, route, priority))] = provider
+                    deadline = self.hedge_delay(provider)
+            raise errors[-1]
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "rate_limits": self.scheduler.stats(),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {
+                p.name: {
+                    "model": p.model,
+                    "circuit": self.breakers[p.name].state,
+                    "trips": self.breakers[p.name].trips,
+                    "hedge_delay_s": round(self.hedge_delay(p), 3),
+                    **self.counters[p.name],
+                    "latency": self.latency[p.name].snapshot(),
+                }
+                for p in self.providers
+            },
+        }
+
+
+def create_llm_router(get_openai_client, openai_model: str) -> LLMRouter:
+    """
+    OpenAI first, Gemini as the hedge/fallback when GEMINI_API_KEY is set.
+    LLM_PROVIDERS="gemini,openai" flips the order. Every router made here
+    shares rate_limiter.scheduler.
+    """
+    available = {"openai": OpenAIProvider("openai", get_openai_client, openai_model)}
+    gemini_key = os.getenv("GEMINI_API_KEY")
+    if gemini_key:
+        available["gemini"] = GeminiProvider(
+            "gemini", os.getenv("GEMINI_FALLBACK_MODEL", "gemini-2.5-flash"), gemini_key
+        )
+
+    order = [name.strip() for name in os.getenv("LLM_PROVIDERS", "openai,gemini").split(",")]
+    providers = [available[name] for name in order if name in available]
+    return LLMRouter(providers or [available["openai"]], scheduler=rate_limiter.scheduler)
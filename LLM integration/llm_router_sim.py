@@ -0,0 +1,104 @@
+"""
+Simulates LLMRouter against fake providers, no network or API keys.
+
+    python llm_router_sim.py --requests 400 --tail-rate 0.05
+
+1. Tail latency: the primary is usually fast but sometimes stalls (the
+   20 s+ completions, scaled down 10x). Compares primary-only against
+   hedging to a second provider at the primary's p95.
+2. Outage: the primary fails every call; the breaker should open and
+   traffic should go straight to the secondary.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from llm_router import CircuitBreaker, FakeProvider, LLMRouter
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def drive(router: LLMRouter, requests: int, concurrency: int) -> tuple:
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await router.complete("prompt " * 200)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, failures
+
+
+def report(label: str, latencies: list, failures: int):
+    print(
+        f"  {label:<14s} p50 {percentile(latencies, 50) * 1000:7.0f} ms  "
+        f"p95 {percentile(latencies, 95) * 1000:7.0f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.0f} ms  "
+        f"max {max(latencies) * 1000:7.0f} ms  failures {failures}"
+    )
+
+
+async def main(args):
+    def primary_latency():
+        if random.random() < args.tail_rate:
+            return random.uniform(2.0, 3.0)
+        return random.lognormvariate(-2.3, 0.3)  # ~100 ms
+
+    def secondary_latency():
+        return random.lognormvariate(-1.9, 0.3)  # ~150 ms
+
+    def router(providers: list) -> LLMRouter:
+        return LLMRouter(providers, min_delay=0.1, max_delay=2.0, default_delay=0.5)
+
+    print(f"Tail latency ({args.requests} requests, {args.tail_rate:.0%} of primary calls stall 2-3 s)")
+    single = router([FakeProvider("primary", primary_latency)])
+    report("primary only", *await drive(single, args.requests, args.concurrency))
+
+    secondary = FakeProvider("secondary", secondary_latency)
+    hedged = router([FakeProvider("primary", primary_latency), secondary])
+    report("hedged", *await drive(hedged, args.requests, args.concurrency))
+    stats = hedged.stats()
+    print(
+        f"  hedged {stats['hedged']} / {stats['requests']} requests "
+        f"({stats['hedged'] / stats['requests']:.1%} extra calls), hedge won {stats['hedge_wins']}, "
+        f"final deadline {stats['providers']['primary']['hedge_delay_s']} s"
+    )
+
+    print("\nOutage (primary fails every call)")
+    failing = FakeProvider("primary", 0.02, error_rate=1.0)
+    backup = FakeProvider("secondary", secondary_latency)
+    outage = LLMRouter(
+        [failing, backup],
+        default_delay=0.5,
+        breaker_factory=lambda: CircuitBreaker(error_rate=0.5, window=10, min_calls=5, cooldown=60),
+    )
+    latencies, failures = await drive(outage, args.requests, args.concurrency)
+    report("failover", latencies, failures)
+    stats = outage.stats()["providers"]["primary"]
+    print(
+        f"  primary called {failing.calls} times for {args.requests} requests, "
+        f"circuit {stats['circuit']} (tripped {stats['trips']}x)"
+    )
+
+
+if __name__ == "__main__":
+    # Every failed call logs a warning; too noisy for the outage run
+    logging.getLogger("llm_router").setLevel(logging.ERROR)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
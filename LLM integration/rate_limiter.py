@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+
+import llm_metrics
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# "provider:model=rpm/tpm,..." e.g. "openai:gpt-4o=500/30000,gemini:gemini-2.5-flash=1000/1000000".
+# Pairs not listed are not throttled up front but still back off on 429s.
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+# Longest a request may queue for budget before it is rejected
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "30"))
+LLM_MAX_QUEUE_LENGTH = int(os.getenv("LLM_MAX_QUEUE_LENGTH", "1000"))
+# Retries of an upstream 429 before giving up on that provider
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+
+
+class RateLimited(RuntimeError):
+    """
+    No upstream budget within the allowed wait, or the provider kept
+    answering 429. retry_after is a hint for the client, in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_limits(spec: str) -> dict:
+    limits = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, budget = item.partition("=")
+        provider, _, model = key.partition(":")
+        rpm, _, tpm = budget.partition("/")
+        limits[(provider.strip(), model.strip())] = (
+            float(rpm) if rpm else None,
+            float(tpm) if tpm else None,
+        )
+    return limits
+
+
+def estimate_tokens(prompt: str, expected_output: int = 500) -> int:
+    # ~4 characters per token for English, plus the answer we expect back
+    return len(prompt) // 4 + expected_output
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    # openai.RateLimitError has status_code, google.genai ClientError has code
+    return getattr(exc, "status_code", None) == 429 or getattr(exc, "code", None) == 429
+
+
+def retry_after_seconds(exc: Exception):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == "retry-after-ms" else seconds
+    return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """
+    Retry-After when the provider sent one, else exponential backoff; both
+    jittered so queued callers do not all retry on the same tick.
+    """
+    if retry_after is not None:
+        return retry_after * random.uniform(1.0, 1.2)
+    return min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class TokenBucket:
+    """
+    capacity per minute, refilled continuously. None means unlimited.
+    """
+
+    def __init__(self, per_minute: float = None):
+        self.per_minute = per_minute
+        self.level = per_minute or 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.per_minute is None:
+            return
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.per_minute is None:
+            return 0.0
+        self._refill(now)
+        # A request bigger than the whole bucket waits for a full one
+        amount = min(amount, self.per_minute)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.per_minute
+
+    def take(self, amount: float):
+        if self.per_minute is not None:
+            self.level -= min(amount, self.per_minute)
+
+    def give_back(self, amount: float):
+        if self.per_minute is not None:
+            self.level = min(self.per_minute, self.level + amount)
+
+
+class Lane:
+    """
+    Budget and priority queue for one provider/model pair.
+    """
+
+    def __init__(self, provider: str, model: str, rpm: float = None, tpm: float = None):
+        self.provider = provider
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self.queue = []     # (priority, seq, tokens, future)
+        self.pump = None
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+
+    def take(self, tokens: int):
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+
+class RateScheduler:
+    """
+    Holds each upstream call until its provider/model has request and token
+    budget, serving queued calls by priority then arrival.
+    """
+
+    def __init__(self, limits: dict = None, max_wait: float = LLM_MAX_QUEUE_WAIT,
+                 max_queue: int = LLM_MAX_QUEUE_LENGTH, metrics: llm_metrics.LLMMetrics = None):
+        self.limits = limits if limits is not None else parse_limits(LLM_RATE_LIMITS)
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.metrics = metrics or llm_metrics.metrics
+        self.lanes = {}
+        self._seq = itertools.count()
+
+    def lane(self, provider: str, model: str) -> Lane:
+        key = (provider, model)
+        lane = self.lanes.get(key)
+        if lane is None:
+            rpm, tpm = self.limits.get(key, (None, None))
+            lane = self.lanes[key] = Lane(provider, model, rpm, tpm)
+        return lane
+
+    async def acquire(self, provider: str, model: str, tokens: int, priority: int = PRIORITY_INTERACTIVE):
+        """
+        Wait for budget. Raises RateLimited when the queue is full or the
+        wait would exceed max_wait.
+        """
+        lane = self.lane(provider, model)
+        started = time.monotonic()
+
+        if not lane.queue and lane.wait_time(tokens, started) == 0:
+            lane.take(tokens)
+            self.metrics.observe_queue_wait(provider, model, priority, 0.0)
+            return
+
+        if len(lane.queue) >= self.max_queue:
+            self.metrics.count_rejection(provider, model, "queue_full")
+            raise RateLimited(f"{provider}/{model} queue is full", lane.wait_time(tokens, started) or 1.0)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.queue, (priority, next(self._seq), tokens, future))
+        if lane.pump is None or lane.pump.done():
+            lane.pump = asyncio.create_task(self._pump(lane))
+
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            self.metrics.count_rejection(provider, model, "timeout")
+            raise RateLimited(
+                f"{provider}/{model} rate limit: no budget within {self.max_wait:.0f}s",
+                lane.wait_time(tokens, time.monotonic()) or 1.0,
+            )
+        self.metrics.observe_queue_wait(provider, model, priority, time.monotonic() - started)
+
+    async def _pump(self, lane: Lane):
+        while lane.queue:
+            priority, seq, tokens, future = lane.queue[0]
+            if future.done():
+                # Caller timed out or was cancelled
+                heapq.heappop(lane.queue)
+                continue
+            delay = lane.wait_time(tokens, time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            heapq.heappop(lane.queue)
+            lane.take(tokens)
+            future.set_result(None)
+
+    def settle(self, provider: str, model: str, estimated: int, actual: int):
+        """
+        Correct the token bucket once the real usage is known.
+        """
+        lane = self.lane(provider, model)
+        if actual < estimated:
+            lane.tokens.give_back(estimated - actual)
+        else:
+            lane.tokens.take(actual - estimated)
+
+    def pause(self, provider: str, model: str, seconds: float):
+        """
+        Upstream said 429: hold everything for this pair for a while.
+        """
+        lane = self.lane(provider, model)
+        lane.paused_until = max(lane.paused_until, time.monotonic() + seconds)
+        self.metrics.count_rejection(provider, model, "upstream_429")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            f"{lane.provider}/{lane.model}": {
+                "rpm": lane.requests.per_minute,
+                "tpm": lane.tokens.per_minute,
+                "queued": sum(1 for entry in lane.queue if not entry[3].done()),
+                "paused_for_s": round(max(0.0, lane.paused_until - now), 2),
+            }
+            for lane in self.lanes.values()
+        }
+
+
+# One scheduler per process, shared by every router and route, so calls on
+# the same API key draw from one RPM/TPM budget
+scheduler = RateScheduler()
@@ -0,0 +1,105 @@
+"""
+Rate-limit scheduling against fake providers, no network or API keys.
+
+    python rate_limiter_sim.py
+
+1. Priorities: interactive and batch requests share a 600 RPM budget;
+   interactive ones should wait far less.
+2. Upstream 429s: the provider rejects the first calls with Retry-After;
+   requests should pause, retry and all succeed.
+3. Overload: more work than the budget allows within max_wait; the excess
+   is rejected with RateLimited (a 429 for the client), not a 500.
+"""
+import asyncio
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+
+from llm_router import FakeProvider, LLMRouter
+from rate_limiter import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimited, RateScheduler
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+class ThrottledProvider(FakeProvider):
+    """
+    Answers 429 with Retry-After for the first `rejections` calls.
+    """
+
+    def __init__(self, name: str, rejections: int, retry_after: float, **kwargs):
+        super().__init__(name, **kwargs)
+        self.rejections = rejections
+        self.retry_after = retry_after
+
+    async def complete(self, prompt: str):
+        if self.rejections > 0:
+            self.rejections -= 1
+            self.calls += 1
+            raise FakeRateLimitError(self.retry_after)
+        return await super().complete(prompt)
+
+
+async def timed(router: LLMRouter, priority: int) -> float:
+    started = time.perf_counter()
+    await router.complete("prompt", route="sim", priority=priority)
+    return time.perf_counter() - started
+
+
+async def priorities():
+    scheduler = RateScheduler({("primary", "fake"): (600, None)}, max_wait=60)
+    router = LLMRouter([FakeProvider("primary", 0.01)], scheduler=scheduler)
+
+    # Drain the burst allowance so everything below has to queue
+    await asyncio.gather(*(router.complete("warmup", route="sim") for _ in range(600)))
+
+    batch = [asyncio.create_task(timed(router, PRIORITY_BATCH)) for _ in range(40)]
+    await asyncio.sleep(0)
+    interactive = [asyncio.create_task(timed(router, PRIORITY_INTERACTIVE)) for _ in range(10)]
+    batch_waits = await asyncio.gather(*batch)
+    interactive_waits = await asyncio.gather(*interactive)
+    print("Priorities (600 RPM, 40 batch queued before 10 interactive)")
+    print(f"  interactive mean wait {statistics.mean(interactive_waits):6.2f} s, max {max(interactive_waits):6.2f} s")
+    print(f"  batch       mean wait {statistics.mean(batch_waits):6.2f} s, max {max(batch_waits):6.2f} s")
+    assert max(interactive_waits) < statistics.mean(batch_waits)
+
+
+async def retry_after():
+    provider = ThrottledProvider("primary", rejections=3, retry_after=0.2, latency=0.01)
+    router = LLMRouter([provider], scheduler=RateScheduler({}, max_wait=10))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(router.complete("p", route="sim") for _ in range(20)), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    print("\nUpstream 429 with Retry-After: 0.2")
+    print(
+        f"  {len(results) - len(errors)}/{len(results)} succeeded in {time.perf_counter() - started:.2f} s, "
+        f"{provider.calls} upstream calls, breaker {router.breakers['primary'].state}"
+    )
+    assert not errors and router.breakers["primary"].state == "closed"
+
+
+async def overload():
+    scheduler = RateScheduler({("primary", "fake"): (60, None)}, max_wait=0.5)
+    router = LLMRouter([FakeProvider("primary", 0.01)], scheduler=scheduler)
+    results = await asyncio.gather(*(router.complete("p", route="sim") for _ in range(100)), return_exceptions=True)
+    limited = [r for r in results if isinstance(r, RateLimited)]
+    other = [r for r in results if isinstance(r, Exception) and not isinstance(r, RateLimited)]
+    print("\nOverload (100 requests, 60 RPM, 0.5 s max queue wait)")
+    print(
+        f"  {len(results) - len(limited) - len(other)} served, {len(limited)} RateLimited "
+        f"(retry_after ~{limited[0].retry_after:.1f} s), {len(other)} other errors"
+    )
+    assert limited and not other
+
+
+if __name__ == "__main__":
+    logging.getLogger("llm_router").setLevel(logging.ERROR)
+    asyncio.run(priorities())
+    asyncio.run(retry_after())
+    asyncio.run(overload())
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalise_text(text: str) -> str:
+    """
+    Case and whitespace differences should not produce a second LLM call.
+    """
+    return re.sub(r"\s+", " ", text or "").strip().casefold()
+
+
+def prompt_version(template: str) -> str:
+    """
+    Short hash of the prompt template, so editing the prompt invalidates
+    everything cached under the old one.
+    """
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def make_key(subtitle: str, category: str, model: str, version: str) -> str:
+    payload = json.dumps(
+        [normalise_text(subtitle), normalise_text(category), model, version],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUTTLCache:
+    """
+    In-process LRU where entries also expire after ttl_seconds.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """
+    Two tiers: the in-process LRU is checked first, then Redis if configured.
+    Entries are {"response": ..., "usage": {"input_tokens", "output_tokens"}}
+    so every hit can be credited with the tokens it saved.
+    """
+
+    def __init__(self, namespace: str, max_entries: int, ttl_seconds: int, redis_url: str = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.local = LRUTTLCache(max_entries, ttl_seconds)
+        self.redis = None
+        if redis_url:
+            import redis
+
+            self.redis = redis.from_url(redis_url, decode_responses=True)
+
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.input_tokens_saved = 0
+        self.output_tokens_saved = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"llm-cache:{self.namespace}:{key}"
+
+    def _record_hit(self, entry: dict, tier: str):
+        usage = entry.get("usage") or {}
+        with self._lock:
+            if tier == "local":
+                self.local_hits += 1
+            else:
+                self.redis_hits += 1
+            self.input_tokens_saved += usage.get("input_tokens", 0)
+            self.output_tokens_saved += usage.get("output_tokens", 0)
+
+    def get(self, key: str):
+        entry = self.local.get(key)
+        if entry is not None:
+            self._record_hit(entry, "local")
+            return entry
+
+        if self.redis is not None:
+            raw = self.redis.get(self._redis_key(key))
+            if raw is not None:
+                entry = json.loads(raw)
+                self.local.set(key, entry)
+                self._record_hit(entry, "redis")
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, response, input_tokens: int = 0, output_tokens: int = 0) -> None:
+        entry = {
+            "response": response,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+        }
+        self.local.set(key, entry)
+        if self.redis is not None:
+            self.redis.set(self._redis_key(key), json.dumps(entry), ex=self.ttl_seconds)
+
+    # Redis calls block, so async routes go through a thread when it is on
+    async def aget(self, key: str):
+        if self.redis is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, response, input_tokens: int = 0, output_tokens: int = 0) -> None:
+        if self.redis is None:
+            return self.set(key, response, input_tokens, output_tokens)
+        await asyncio.to_thread(self.set, key, response, input_tokens, output_tokens)
+
+    def stats(self) -> dict:
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "backend": "memory+redis" if self.redis is not None else "memory",
+            "entries": len(self.local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "input_tokens_saved": self.input_tokens_saved,
+            "output_tokens_saved": self.output_tokens_saved,
+        }
+
+
+def create_response_cache(namespace: str) -> ResponseCache:
+    """
+    In-process only by default; USE_REDIS=true (as in docker-compose) adds
+    the Redis tier.
+    """
+    redis_url = None
+    if os.getenv("USE_REDIS", "false").lower() == "true":
+        host = os.getenv("REDIS_HOST", "localhost")
+        port = os.getenv("REDIS_PORT", "6379")
+        redis_url = os.getenv("REDIS_URL", f"redis://{host}:{port}/0")
+
+    return ResponseCache(
+        namespace,
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+        ttl_seconds=int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        redis_url=redis_url,
+    )
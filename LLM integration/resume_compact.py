@@ -0,0 +1,193 @@
+import functools
+import html
+import os
+import re
+
+# Prompt tokens the resume block may take; lower-priority sections are cut
+# first when a resume is over
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "1200"))
+
+# Lower number = more important; matched as substrings of the lowercased key
+SECTION_PRIORITY = (
+    ("name", 0), ("headline", 0), ("title", 0), ("label", 0),
+    ("summary", 1), ("about", 1), ("objective", 1), ("profile", 1),
+    ("skill", 2), ("experience", 2), ("work", 2), ("employment", 2),
+    ("project", 3), ("education", 3),
+    ("achievement", 4), ("award", 4), ("certif", 4), ("accomplish", 4),
+    ("publication", 5), ("language", 5), ("volunteer", 5),
+    ("interest", 6), ("hobb", 6),
+    ("email", 7), ("phone", 7), ("address", 7), ("contact", 7), ("url", 7), ("link", 7),
+    ("social", 7), ("reference", 7),
+)
+DEFAULT_PRIORITY = 5
+
+# Rendering and bookkeeping fields that say nothing about the candidate
+DROP_KEYS = re.compile(
+    r"^(_?id|uuid|.*_id|created_at|updated_at|template|theme|color|colour|font|style|layout|"
+    r"photo|avatar|image|picture|order|index|position_index|visible|hidden|html|css)$"
+)
+
+# Placeholders the resume builder leaves in unfilled fields
+EMPTY_VALUES = {"", "n/a", "na", "null", "none", "undefined", "-", "--"}
+
+# Keys whose value reads fine without a label, e.g. "Senior Engineer, Acme"
+BARE_KEYS = {
+    "name", "title", "role", "position", "company", "employer", "organization", "organisation",
+    "institution", "school", "university", "degree",
+}
+
+_BREAK_TAGS = re.compile(r"<\s*(br|/p|/li|/div|/h[1-6]|/tr)\s*/?\s*>", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+_SEPARATORS = re.compile(r"(\s*;\s*)+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+@functools.lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = _encoder()
+    if encoder is None:
+        # Rough rule of thumb for English text
+        return len(text) // 4
+    return len(encoder.encode(text))
+
+
+def strip_markup(text: str) -> str:
+    """Plain text from an HTML fragment; block ends become "; "."""
+    text = _BREAK_TAGS.sub("; ", text)
+    text = html.unescape(_TAGS.sub(" ", text))
+    text = _SEPARATORS.sub("; ", _SPACE.sub(" ", text))
+    return text.strip(" ;")
+
+
+def _label(key: str) -> str:
+    # "start_date" and "startDate" both become "start date"
+    return _CAMEL.sub(" ", str(key)).replace("_", " ").strip().lower()
+
+
+def _priority(key: str) -> int:
+    key = str(key).lower()
+    for fragment, priority in SECTION_PRIORITY:
+        if fragment in key:
+            return priority
+    return DEFAULT_PRIORITY
+
+
+def _clean(value):
+    """
+    The value with markup stripped and empty fields removed, or None if
+    nothing is left.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        text = strip_markup(value)
+        return None if text.lower() in EMPTY_VALUES else text
+    if isinstance(value, dict):
+        if value.get("visible") is False or value.get("hidden") is True:
+            # Sections the user switched off in the builder
+            return None
+        cleaned = {}
+        for key, item in value.items():
+            if DROP_KEYS.match(str(key).lower()):
+                continue
+            item = _clean(item)
+            if item is not None:
+                cleaned[key] = item
+        return cleaned or None
+    if isinstance(value, (list, tuple)):
+        cleaned = [item for item in (_clean(item) for item in value) if item is not None]
+        return cleaned or None
+    return _clean(str(value))
+
+
+def _inline(value) -> str:
+    """One line for a cleaned value: bare names first, then "label: value" pairs."""
+    if isinstance(value, dict):
+        bare = [_inline(item) for key, item in value.items() if str(key).lower() in BARE_KEYS]
+        labelled = [
+            f"{_label(key)}: {_inline(item)}" for key, item in value.items() if str(key).lower() not in BARE_KEYS
+        ]
+        return "; ".join(filter(None, [", ".join(bare)] + labelled))
+    if isinstance(value, list):
+        return "; ".join(_inline(item) for item in value)
+    return value
+
+
+def _sections(resume: dict):
+    """
+    (priority, heading, lines) per section. Groupings without a priority of
+    their own ("basics", "personal_info") are flattened into their fields.
+    """
+    for key, value in resume.items():
+        priority = _priority(key)
+        label = _label(key).title()
+        if isinstance(value, dict) and priority == DEFAULT_PRIORITY:
+            yield from _sections(value)
+        elif isinstance(value, dict):
+            if any(isinstance(item, (dict, list)) for item in value.values()):
+                yield priority, f"{label}:", [f"- {_label(k)}: {_inline(v)}" for k, v in value.items()]
+            else:
+                yield priority, None, [f"{label}: {_inline(value)}"]
+        elif isinstance(value, list):
+            if all(isinstance(item, str) and len(item) <= 40 for item in value):
+                yield priority, None, [f"{label}: {', '.join(value)}"]
+            else:
+                yield priority, f"{label}:", [f"- {_inline(item)}" for item in value]
+        else:
+            yield priority, None, [f"{label}: {value}"]
+
+
+def compact_resume(resume: dict, budget: int = RESUME_TOKEN_BUDGET) -> str:
+    """
+    Resume data as compact labelled lines for a prompt: empty fields and
+    markup removed, nested sections flattened, and at most `budget` tokens,
+    cutting from the end of the lowest-priority sections first.
+    """
+    cleaned = _clean(resume)
+    if not isinstance(cleaned, dict):
+        return _inline(cleaned) if cleaned else ""
+
+    sections = []
+    for order, (priority, heading, lines) in enumerate(_sections(cleaned)):
+        sections.append({
+            "rank": (priority, order),
+            "heading": heading,
+            "lines": [(line, count_tokens(line) + 1) for line in lines],
+            "heading_tokens": count_tokens(heading) + 1 if heading else 0,
+        })
+
+    total = sum(s["heading_tokens"] + sum(t for _, t in s["lines"]) for s in sections)
+    while total > budget and sections:
+        victim = max(sections, key=lambda s: s["rank"])
+        if len(sections) == 1 and len(victim["lines"]) == 1:
+            # Only the most important line is left: shorten it instead
+            line, tokens = victim["lines"][0]
+            keep = max(0, len(line) * (budget - victim["heading_tokens"]) // tokens)
+            victim["lines"][0] = (line[:keep].rsplit(" ", 1)[0], budget)
+            break
+        _, tokens = victim["lines"].pop()
+        total -= tokens
+        if not victim["lines"]:
+            sections.remove(victim)
+            total -= victim["heading_tokens"]
+
+    out = []
+    for section in sections:
+        if section["heading"]:
+            out.append(section["heading"])
+        out.extend(line for line, _ in section["lines"])
+    return "\n".join(out)
@@ -0,0 +1,172 @@
+"""
+Regression check for the compact resume serialiser used by /generate/summary.
+
+    python resume_compact_check.py                     # offline: prompt keeps key facts
+    python resume_compact_check.py resumes.jsonl       # your own samples
+    python resume_compact_check.py --live --model gpt-4o-mini
+
+Each sample is {"resume": {...}, "facts": [...]}, where facts are strings a
+good summary must mention (name, current role, employer, main skills,
+degree). Offline, every fact has to survive compact_resume at the default
+budget and the budget has to hold. With --live (needs OPENAI_API_KEY) a
+summary is generated from the old repr prompt and the compact one, and the
+facts found in each are compared, along with prompt tokens and TTFT.
+"""
+import argparse
+import json
+import time
+
+from resume_compact import RESUME_TOKEN_BUDGET, compact_resume, count_tokens
+
+SAMPLES = [
+    {
+        "resume": {
+            "id": "64f1c0e2a9",
+            "template": "modern-blue",
+            "personal_info": {
+                "name": "Sam Lee",
+                "job_title": "Senior Backend Engineer",
+                "email": "sam@example.com",
+                "phone": "",
+                "photo": "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk",
+                "website": None,
+            },
+            "summary": "<p>Backend engineer with <strong>8 years</strong> building payment APIs.</p><p><br></p>",
+            "skills": ["Python", "FastAPI", "PostgreSQL", "Kafka", "", None, "AWS"],
+            "experience": [
+                {
+                    "company": "Stripe",
+                    "position": "Senior Backend Engineer",
+                    "start_date": "2020-03",
+                    "end_date": "Present",
+                    "description": "<ul><li>Led the migration of the ledger service to Kafka, cutting "
+                                   "settlement lag from 6 h to 15 min.</li><li>Mentored 4 engineers.</li></ul>",
+                    "location": "N/A",
+                    "section_id": "exp-1",
+                },
+                {
+                    "company": "Shopify",
+                    "position": "Backend Engineer",
+                    "start_date": "2016-06",
+                    "end_date": "2020-02",
+                    "description": "<p>Built the order export pipeline in Python &amp; Celery.</p>",
+                    "achievements": [],
+                },
+            ],
+            "projects": [{"name": "", "description": "", "link": ""}],
+            "education": [{"degree": "BSc Computer Science", "institution": "University of Waterloo", "gpa": None}],
+            "certifications": {"visible": False, "items": [{"name": "AWS Solutions Architect"}]},
+            "interests": ["Chess", "Cycling"],
+            "styles": {"font": "Inter", "color": "#0047ab"},
+        },
+        "facts": ["Sam Lee", "Senior Backend Engineer", "Stripe", "Shopify", "Python", "Kafka",
+                  "Computer Science", "Waterloo", "8 years"],
+    },
+    {
+        "resume": {
+            "basics": {
+                "name": "Priya Nair",
+                "label": "Data Scientist",
+                "summary": "Data scientist focused on demand forecasting for retail.",
+                "profiles": [{"network": "LinkedIn", "url": "https://linkedin.com/in/priya"}],
+                "location": {"city": "Bangalore", "countryCode": "IN", "postalCode": ""},
+            },
+            "work": [
+                {
+                    "name": "Flipkart",
+                    "position": "Data Scientist",
+                    "startDate": "2021-01",
+                    "highlights": ["Cut forecast error by 18% with gradient-boosted models",
+                                   "Owned the weekly demand dashboard"],
+                },
+            ],
+            "education": [{"institution": "IIT Madras", "studyType": "MTech", "area": "Statistics"}],
+            "skills": [{"name": "Machine Learning", "keywords": ["XGBoost", "PyTorch", "SQL"]}],
+            "publications": [{"name": "Hierarchical forecasting at scale " * 20, "publisher": "KDD"}] * 30,
+            "references": [{"name": "A. Manager", "reference": "Priya is excellent. " * 50}],
+        },
+        "facts": ["Priya Nair", "Data Scientist", "Flipkart", "18%", "XGBoost", "IIT Madras", "Statistics"],
+    },
+]
+
+
+def facts_found(text: str, facts: list) -> list:
+    lowered = text.lower()
+    return [fact for fact in facts if fact.lower() in lowered]
+
+
+def offline(samples: list, budget: int) -> bool:
+    ok = True
+    print(f"{'sample':<8s} {'repr tokens':>12s} {'compact':>8s} {'facts kept':>11s}")
+    for i, sample in enumerate(samples):
+        compact = compact_resume(sample["resume"], budget)
+        before = count_tokens(str(sample["resume"]))
+        after = count_tokens(compact)
+        kept = facts_found(compact, sample["facts"])
+        print(f"{i:<8d} {before:12d} {after:8d} {len(kept):5d}/{len(sample['facts']):<5d}")
+        missing = sorted(set(sample["facts"]) - set(kept))
+        if missing:
+            print(f"         missing: {missing}")
+        if missing or after > budget:
+            ok = False
+    return ok
+
+
+def live(samples: list, model: str) -> bool:
+    from openai import OpenAI
+
+    client = OpenAI()
+    ok = True
+    print(f"\n{'sample':<8s} {'prompt':<8s} {'input tok':>10s} {'TTFT':>8s} {'facts in summary':>17s}")
+    for i, sample in enumerate(samples):
+        found = {}
+        for label, block in (("repr", str(sample["resume"])), ("compact", compact_resume(sample["resume"]))):
+            prompt = (
+                "Write a 5-8 sentence third-person professional summary of this candidate. "
+                f"Use only the data given.\n\n{block}"
+            )
+            started = time.perf_counter()
+            ttft = None
+            text = []
+            usage = None
+            for chunk in client.chat.completions.create(
+                model=model, stream=True, stream_options={"include_usage": True},
+                messages=[{"role": "user", "content": prompt}],
+            ):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    ttft = ttft if ttft is not None else time.perf_counter() - started
+                    text.append(delta)
+                if chunk.usage:
+                    usage = chunk.usage
+            found[label] = facts_found("".join(text), sample["facts"])
+            print(
+                f"{i:<8d} {label:<8s} {usage.prompt_tokens if usage else 0:10d} "
+                f"{(ttft or 0) * 1000:6.0f}ms {len(found[label]):9d}/{len(sample['facts'])}"
+            )
+        # The compact prompt must not lose facts the old one got across
+        lost = sorted(set(found["repr"]) - set(found["compact"]))
+        if lost:
+            print(f"         lost with compact prompt: {lost}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("samples", nargs="?", help="JSONL of {resume, facts}; built-in samples if omitted")
+    parser.add_argument("--budget", type=int, default=RESUME_TOKEN_BUDGET)
+    parser.add_argument("--live", action="store_true", help="also generate summaries with the OpenAI API")
+    parser.add_argument("--model", default="gpt-4o")
+    args = parser.parse_args()
+
+    samples = SAMPLES
+    if args.samples:
+        with open(args.samples, "r", encoding="utf-8") as f:
+            samples = [json.loads(line) for line in f if line.strip()]
+
+    passed = offline(samples, args.budget)
+    if args.live:
+        passed = live(samples, args.model) and passed
+    print("\nAll checks passed" if passed else "\nKey facts lost")
+    raise SystemExit(0 if passed else 1)
@@ -0,0 +1,56 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight coroutine and
+    all get its result or its exception. A caller that is cancelled only
+    stops waiting; the shared call is cancelled once nobody is waiting.
+    """
+
+    def __init__(self):
+        self._calls = {}    # key -> [task, waiters]
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, make_coro):
+        """
+        make_coro() builds the coroutine; only the first caller's is run.
+        """
+        entry = self._calls.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(make_coro())
+            entry = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, entry=entry: self._forget(key, entry))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                # Last waiter gone: nobody wants the result any more. Drop
+                # the entry now so a new caller starts fresh instead of
+                # joining the call being cancelled.
+                if self._calls.get(key) is entry:
+                    del self._calls[key]
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def _forget(self, key: str, entry: list):
+        # Only drop our own entry; a new call may already use the key
+        if self._calls.get(key) is entry:
+            del self._calls[key]
+        task = entry[0]
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter was cancelled
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
+
@@ -0,0 +1,100 @@
+"""
+Concurrency checks for single_flight, against a fake upstream.
+
+    python single_flight_check.py --duplicates 50
+
+Fires N identical requests at once and asserts exactly one upstream call,
+then checks error propagation, cancellation of one waiter and cancellation
+of every waiter.
+"""
+import argparse
+import asyncio
+
+from single_flight import SingleFlight
+
+
+class FakeUpstream:
+    def __init__(self, latency: float = 0.1, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, payload: str) -> dict:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ValueError("Invalid JSON returned by LLM")
+        return {"payload": payload}
+
+
+async def check_duplicates(n: int):
+    flight = SingleFlight()
+    upstream = FakeUpstream()
+    results = await asyncio.gather(
+        *(flight.do("same-key", lambda: upstream.generate("hello")) for _ in range(n))
+    )
+    assert upstream.calls == 1, upstream.calls
+    assert all(result == {"payload": "hello"} for result in results)
+    assert flight.stats() == {"in_flight": 0, "started": 1, "coalesced": n - 1}, flight.stats()
+
+    # Finished calls are not reused: the next request goes upstream again
+    await flight.do("same-key", lambda: upstream.generate("hello"))
+    assert upstream.calls == 2
+    print(f"ok  {n} duplicates -> {upstream.calls - 1} upstream call")
+
+
+async def check_errors(n: int):
+    flight = SingleFlight()
+    upstream = FakeUpstream(fail=True)
+    results = await asyncio.gather(
+        *(flight.do("k", lambda: upstream.generate("x")) for _ in range(n)), return_exceptions=True
+    )
+    assert upstream.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    print(f"ok  one upstream error reaches all {n} callers")
+
+
+async def check_cancel_one(n: int):
+    flight = SingleFlight()
+    upstream = FakeUpstream(latency=0.2)
+    tasks = [asyncio.create_task(flight.do("k", lambda: upstream.generate("x"))) for _ in range(n)]
+    await asyncio.sleep(0.05)
+    tasks[0].cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert all(result == {"payload": "x"} for result in results[1:])
+    assert upstream.calls == 1 and upstream.cancelled == 0
+    print("ok  cancelling one caller leaves the shared call running for the rest")
+
+
+async def check_cancel_all(n: int):
+    flight = SingleFlight()
+    upstream = FakeUpstream(latency=0.2)
+    tasks = [asyncio.create_task(flight.do("k", lambda: upstream.generate("x"))) for _ in range(n)]
+    await asyncio.sleep(0.05)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert upstream.cancelled == 1, upstream.cancelled
+
+    # A caller arriving afterwards starts a new call rather than joining it
+    assert await flight.do("k", lambda: upstream.generate("x")) == {"payload": "x"}
+    assert upstream.calls == 2
+    print("ok  cancelling every caller cancels the upstream call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duplicates", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(check_duplicates(args.duplicates))
+    asyncio.run(check_errors(args.duplicates))
+    asyncio.run(check_cancel_one(args.duplicates))
+    asyncio.run(check_cancel_all(args.duplicates))
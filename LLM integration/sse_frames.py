@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Flush buffered text after this long or this many bytes, whichever is
+# first. SSE_FLUSH_MS=0 sends one frame per delta.
+SSE_FLUSH_MS = float(os.getenv("SSE_FLUSH_MS", "50"))
+SSE_FLUSH_BYTES = int(os.getenv("SSE_FLUSH_BYTES", "512"))
+# Comment frame sent when nothing else went out for this long, so proxies
+# and browsers do not time out a stalled stream
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+HEARTBEAT = ": ping\n\n"
+
+
+def dumps(data) -> str:
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"))
+
+
+def sse(event: str, data: dict) -> str:
+    """Format a single SSE frame."""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+async def coalesce(deltas, event: str = "chunk", flush_ms: float = SSE_FLUSH_MS,
+                   flush_bytes: int = SSE_FLUSH_BYTES, heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS):
+    """
+    SSE frames from an async iterator of text deltas. The first delta goes
+    out at once (time to first token is unchanged); later ones are batched
+    into one {"text": ...} frame per flush. Heartbeats fill long pauses.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = deltas.__aiter__()
+    pending = None
+    buffer = []
+    size = 0
+    first_buffered = 0.0
+    last_sent = loop.time()
+    sent_any = False
+
+    try:
+        while True:
+            if pending is None:
+                # Kept across timeouts: cancelling __anext__ would kill the source
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            now = loop.time()
+            if buffer:
+                timeout = max(0.0, first_buffered + flush_ms / 1000 - now)
+            elif heartbeat_seconds > 0:
+                timeout = max(0.0, last_sent + heartbeat_seconds - now)
+            else:
+                timeout = None
+
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if pending in done:
+                try:
+                    text = pending.result()
+                except StopAsyncIteration:
+                    pending = None
+                    break
+                pending = None
+
+                if flush_ms <= 0 or not sent_any:
+                    yield sse(event, {"text": text})
+                    sent_any = True
+                    last_sent = loop.time()
+                    continue
+
+                if not buffer:
+                    first_buffered = loop.time()
+                buffer.append(text)
+                size += len(text.encode("utf-8"))
+                if size < flush_bytes:
+                    continue
+
+            if buffer:
+                yield sse(event, {"text": "".join(buffer)})
+                buffer = []
+                size = 0
+            else:
+                yield HEARTBEAT
+            last_sent = loop.time()
+
+        if buffer:
+            yield sse(event, {"text": "".join(buffer)})
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            # Let the cancelled read finish before the caller closes the
+            # source, and mark its outcome as retrieved
+            await asyncio.wait({pending})
+        if pending is not None and not pending.cancelled():
+            pending.exception()
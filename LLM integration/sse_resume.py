@@ -0,0 +1,268 @@
+import asyncio
+import itertools
+import os
+import time
+import uuid
+from collections import deque
+
+from sse_frames import HEARTBEAT, SSE_HEARTBEAT_SECONDS, sse
+
+# Generated frames are kept this long after the last one, so a client that
+# reconnects with Last-Event-ID can pick up where it left off
+SSE_RESUME_TTL_SECONDS = int(os.getenv("SSE_RESUME_TTL_SECONDS", "300"))
+# Frames kept per stream; older ones are dropped and a resume past them
+# gets a "gap" event
+SSE_RESUME_BUFFER_EVENTS = int(os.getenv("SSE_RESUME_BUFFER_EVENTS", "1024"))
+# How long a generation keeps running with nobody attached before the
+# upstream call is stopped
+SSE_RESUME_GRACE_SECONDS = float(os.getenv("SSE_RESUME_GRACE_SECONDS", "10"))
+
+
+def new_stream_id() -> str:
+    return uuid.uuid4().hex
+
+
+def with_id(stream_id: str, seq: int, frame: str) -> str:
+    """Prefix a frame with its SSE id, "<stream id>:<sequence>"."""
+    return f"id: {stream_id}:{seq}\n{frame}"
+
+
+def parse_event_id(value):
+    """
+    (stream_id, seq) from a Last-Event-ID header, or None if it is missing
+    or not one of ours.
+    """
+    if not value:
+        return None
+    stream_id, _, seq = value.strip().rpartition(":")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
+
+
+class _Buffer:
+    __slots__ = ("events", "last_seq", "finished", "changed", "expires_at", "listener_seen")
+
+    def __init__(self, max_events: int, ttl: float):
+        now = time.monotonic()
+        self.events = deque(maxlen=max_events)     # (seq, frame)
+        self.last_seq = 0
+        self.finished = False
+        self.changed = asyncio.Event()
+        self.expires_at = now + ttl
+        self.listener_seen = now
+
+
+class MemoryEventLog:
+    """
+    Per-stream ring buffers in a dict. Only a reconnect that lands on the
+    same worker can resume.
+    """
+
+    def __init__(self, max_events: int = SSE_RESUME_BUFFER_EVENTS, ttl: float = SSE_RESUME_TTL_SECONDS,
+                 grace: float = SSE_RESUME_GRACE_SECONDS):
+        self.max_events = max_events
+        self.ttl = ttl
+        self.grace = grace
+        self._streams = {}
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [stream_id for stream_id, buf in self._streams.items() if buf.expires_at < now]
+        for stream_id in expired:
+            self._discard(stream_id)
+
+    def _discard(self, stream_id: str):
+        buf = self._streams.pop(stream_id, None)
+        if buf is not None:
+            buf.changed.set()
+
+    def _notify(self, buf: _Buffer):
+        buf.expires_at = time.monotonic() + self.ttl
+        buf.changed.set()
+        buf.changed = asyncio.Event()
+
+    async def create(self, stream_id: str) -> None:
+        self._purge_expired()
+        self._streams[stream_id] = _Buffer(self.max_events, self.ttl)
+
+    async def exists(self, stream_id: str) -> bool:
+        buf = self._streams.get(stream_id)
+        return buf is not None and buf.expires_at >= time.monotonic()
+
+    async def append(self, stream_id: str, frame: str):
+        buf = self._streams.get(stream_id)
+        if buf is None:
+            return None
+        buf.last_seq += 1
+        buf.events.append((buf.last_seq, frame))
+        self._notify(buf)
+        return buf.last_seq
+
+    async def finish(self, stream_id: str) -> None:
+        buf = self._streams.get(stream_id)
+        if buf is not None:
+            buf.finished = True
+            self._notify(buf)
+
+    async def discard(self, stream_id: str) -> None:
+        self._discard(stream_id)
+
+    async def touch(self, stream_id: str) -> None:
+        buf = self._streams.get(stream_id)
+        if buf is not None:
+            buf.listener_seen = time.monotonic()
+
+    async def has_listener(self, stream_id: str) -> bool:
+        buf = self._streams.get(stream_id)
+        return buf is not None and time.monotonic() - buf.listener_seen < self.grace
+
+    async def read(self, stream_id: str, after: int, timeout: float):
+        """
+        Frames after `after` and whether the stream has finished, waiting up
+        to `timeout` for new ones. None once the stream is gone.
+        """
+        buf = self._streams.get(stream_id)
+        if buf is None:
+            return None
+        if buf.last_seq <= after and not buf.finished:
+            try:
+                await asyncio.wait_for(buf.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            buf = self._streams.get(stream_id)
+            if buf is None:
+                return None
+
+        entries = []
+        if buf.events and buf.last_seq > after:
+            # Sequence numbers are contiguous, so skip straight to after + 1
+            oldest = buf.events[0][0]
+            entries = list(itertools.islice(buf.events, max(0, after + 1 - oldest), None))
+        return entries, buf.finished
+
+
+class RedisEventLog:
+    """
+    Per-stream Redis Streams capped with MAXLEN, so a reconnect can resume
+    on any worker behind the load balancer. Entry ids are "<seq>-0"; the
+    last entry of a finished stream carries an "end" field.
+    """
+
+    def __init__(self, url: str, prefix: str = "speech2text:sse:", max_events: int = SSE_RESUME_BUFFER_EVENTS,
+                 ttl: float = SSE_RESUME_TTL_SECONDS, grace: float = SSE_RESUME_GRACE_SECONDS):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self.max_events = max_events
+        self.ttl = ttl
+        self.grace = grace
+
+    def _keys(self, stream_id: str):
+        key = self._prefix + stream_id
+        return key, key + ":seq", key + ":listener"
+
+    async def create(self, stream_id: str) -> None:
+        _, seq_key, listener_key = self._keys(stream_id)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(seq_key, 0, ex=int(self.ttl))
+            pipe.set(listener_key, 1, px=int(self.grace * 1000))
+            await pipe.execute()
+
+    async def exists(self, stream_id: str) -> bool:
+        return bool(await self._redis.exists(self._keys(stream_id)[1]))
+
+    async def _add(self, stream_id: str, fields: dict):
+        key, seq_key, _ = self._keys(stream_id)
+        if not await self._redis.exists(seq_key):
+            return None
+        seq = await self._redis.incr(seq_key)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.xadd(key, fields, id=f"{seq}-0", maxlen=self.max_events, approximate=True)
+            pipe.expire(key, int(self.ttl))
+            pipe.expire(seq_key, int(self.ttl))
+            await pipe.execute()
+        return seq
+
+    async def append(self, stream_id: str, frame: str):
+        return await self._add(stream_id, {"frame": frame})
+
+    async def finish(self, stream_id: str) -> None:
+        await self._add(stream_id, {"end": 1})
+
+    async def discard(self, stream_id: str) -> None:
+        await self._redis.delete(*self._keys(stream_id))
+
+    async def touch(self, stream_id: str) -> None:
+        await self._redis.set(self._keys(stream_id)[2], 1, px=int(self.grace * 1000))
+
+    async def has_listener(self, stream_id: str) -> bool:
+        return bool(await self._redis.exists(self._keys(stream_id)[2]))
+
+    async def read(self, stream_id: str, after: int, timeout: float):
+        key, seq_key, _ = self._keys(stream_id)
+        raw = await self._redis.xrange(key, min=f"{after + 1}-0")
+        if not raw:
+            if not await self._redis.exists(seq_key):
+                return None
+            result = await self._redis.xread({key: f"{after}-0"}, block=max(1, int(timeout * 1000)))
+            raw = result[0][1] if result else []
+
+        entries = []
+        finished = False
+        for entry_id, fields in raw:
+            if "end" in fields:
+                finished = True
+                break
+            entries.append((int(entry_id.split("-", 1)[0]), fields["frame"]))
+        return entries, finished
+
+
+def create_event_log():
+    """
+    In-memory by default; set USE_REDIS=true (as in docker-compose) so a
+    reconnect can resume on any worker.
+    """
+    if os.getenv("USE_REDIS", "false").lower() == "true":
+        host = os.getenv("REDIS_HOST", "localhost")
+        port = os.getenv("REDIS_PORT", "6379")
+        url = os.getenv("REDIS_URL", f"redis://{host}:{port}/0")
+        return RedisEventLog(url)
+    return MemoryEventLog()
+
+
+async def subscribe(log, stream_id: str, after: int = 0, heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS):
+    """
+    Frames of a stream after sequence `after`, each tagged with its id:
+    buffered ones first, then live ones as they are appended. Marks the
+    stream as listened to while iterating, and fills pauses with heartbeats.
+    """
+    loop = asyncio.get_running_loop()
+    wait = log.grace / 2
+    if heartbeat_seconds > 0:
+        wait = min(wait, heartbeat_seconds)
+    last_sent = loop.time()
+
+    while True:
+        await log.touch(stream_id)
+        result = await log.read(stream_id, after, wait)
+        if result is None:
+            return
+        entries, finished = result
+
+        if entries and entries[0][0] > after + 1:
+            # The ring buffer no longer holds everything the client missed
+            yield sse("gap", {"from": after + 1, "to": entries[0][0] - 1})
+        for seq, frame in entries:
+            yield with_id(stream_id, seq, frame)
+            after = seq
+        if finished:
+            return
+
+        now = loop.time()
+        if entries:
+            last_sent = now
+        elif heartbeat_seconds > 0 and now - last_sent >= heartbeat_seconds:
+            yield HEARTBEAT
+            last_sent = now
@@ -0,0 +1,124 @@
+"""
+Resume checks for sse_resume against the in-memory log, no network needed.
+
+    python sse_resume_check.py --frames 200
+
+A fake producer appends frames as a generation would. Checks that a client
+which drops mid-stream and reconnects with its Last-Event-ID gets every
+frame exactly once, that a resume past the ring buffer reports a gap, that
+buffers expire after the TTL, and that a stream with nobody listening is
+reported as abandoned after the grace period.
+"""
+import argparse
+import asyncio
+import json
+
+import sse_resume
+from sse_resume import MemoryEventLog, subscribe
+
+
+async def produce(log: MemoryEventLog, stream_id: str, frames: int, interval: float, produced: list):
+    for i in range(frames):
+        await asyncio.sleep(interval)
+        if not await log.has_listener(stream_id):
+            produced.append("abandoned")
+            await log.discard(stream_id)
+            return
+        await log.append(stream_id, f"event: chunk\ndata: {json.dumps({'text': f'{i} '})}\n\n")
+    await log.finish(stream_id)
+    produced.append("finished")
+
+
+def parse(frame: str):
+    event_id = event = data = None
+    for line in frame.strip().split("\n"):
+        if line.startswith("id: "):
+            event_id = line[4:]
+        elif line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+    return event_id, event, data
+
+
+async def read(log: MemoryEventLog, stream_id: str, after: int, stop_after: int = None):
+    """Texts received and the last event id; stops early like a dropped client."""
+    texts, events, last_id = [], [], None
+    async for frame in subscribe(log, stream_id, after, heartbeat_seconds=0.05):
+        event_id, event, data = parse(frame)
+        events.append(event)
+        if event == "chunk":
+            texts.append(data["text"])
+            last_id = event_id
+            if stop_after is not None and len(texts) >= stop_after:
+                break
+    return texts, events, last_id
+
+
+async def reconnect(frames: int):
+    log = MemoryEventLog(max_events=frames * 2, ttl=5, grace=1)
+    stream_id = sse_resume.new_stream_id()
+    await log.create(stream_id)
+    produced = []
+    producer = asyncio.create_task(produce(log, stream_id, frames, 0.002, produced))
+
+    first, _, last_id = await read(log, stream_id, 0, stop_after=frames // 3)
+    # Offline for a while; the producer keeps going
+    await asyncio.sleep(0.2)
+    resumed_id, after = sse_resume.parse_event_id(last_id)
+    rest, _, _ = await read(log, resumed_id, after)
+    await producer
+
+    expected = [f"{i} " for i in range(frames)]
+    print(f"Reconnect: {len(first)} frames, dropped, resumed from {last_id.split(':')[1]} and got {len(rest)} more")
+    assert first + rest == expected, "frames lost or duplicated"
+    assert produced == ["finished"]
+
+
+async def gap(frames: int):
+    log = MemoryEventLog(max_events=frames // 4, ttl=5, grace=1)
+    stream_id = sse_resume.new_stream_id()
+    await log.create(stream_id)
+    produced = []
+    await produce(log, stream_id, frames, 0, produced)
+
+    texts, events, _ = await read(log, stream_id, 0)
+    print(f"Gap: buffer of {frames // 4}, resumed from 0, events start with {events[0]!r}, {len(texts)} frames")
+    assert events[0] == "gap" and len(texts) == frames // 4
+
+
+async def expiry():
+    log = MemoryEventLog(max_events=16, ttl=0.1, grace=1)
+    stream_id = sse_resume.new_stream_id()
+    await log.create(stream_id)
+    await log.append(stream_id, "event: chunk\ndata: {}\n\n")
+    await log.finish(stream_id)
+    await asyncio.sleep(0.2)
+    await log.create(sse_resume.new_stream_id())   # creating a stream purges expired ones
+    exists = await log.exists(stream_id)
+    print(f"Expiry: finished stream still resumable after TTL: {exists}")
+    assert not exists
+
+
+async def abandoned(frames: int):
+    log = MemoryEventLog(max_events=frames, ttl=5, grace=0.1)
+    stream_id = sse_resume.new_stream_id()
+    await log.create(stream_id)
+    produced = []
+    producer = asyncio.create_task(produce(log, stream_id, frames, 0.005, produced))
+    texts, _, _ = await read(log, stream_id, 0, stop_after=5)
+    await producer
+    print(f"Abandoned: client left after {len(texts)} frames, producer {produced[0]}")
+    assert produced == ["abandoned"] and not await log.exists(stream_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(reconnect(args.frames))
+    asyncio.run(gap(args.frames))
+    asyncio.run(expiry())
+    asyncio.run(abandoned(args.frames))
+    print("\nAll checks passed")
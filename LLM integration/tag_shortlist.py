@@ -0,0 +1,105 @@
+import math
+import os
+import re
+from collections import Counter
+
+# How many candidate tags go to the model; 0 sends the full list
+TAG_SHORTLIST_K = int(os.getenv("TAG_SHORTLIST_K", "30"))
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "get",
+    "go", "going", "got", "has", "have", "i", "in", "into", "is", "it", "its", "just",
+    "keep", "let", "like", "me", "my", "nice", "now", "of", "on", "one", "or", "our",
+    "out", "so", "that", "the", "their", "them", "then", "there", "this", "to", "up",
+    "we", "what", "when", "with", "you", "your",
+}
+
+
+def stem(word: str) -> str:
+    """
+    Crude suffix stripping so "catching", "catches" and "catch" meet.
+    """
+    for suffix in ("ing", "es", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list:
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    return [stem(word) for word in words if word not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of short documents, precomputed once.
+    """
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(doc)) for doc in documents]
+        self.doc_lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if documents else 0.0
+
+        n_docs = len(documents)
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        self.idf = {
+            term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+        # Inverted index so a query only touches documents sharing a term
+        self.postings = {}
+        for doc_id, tf in enumerate(self.term_freqs):
+            for term in tf:
+                self.postings.setdefault(term, []).append(doc_id)
+
+    def scores(self, query: str) -> dict:
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id in self.postings[term]:
+                tf = self.term_freqs[doc_id][term]
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+
+class TagShortlister:
+    """
+    Ranks allowed tags against a subtitle. Tags are plain names or
+    {"name", "description"} dicts; both name and description are indexed.
+    """
+
+    def __init__(self, tags: list):
+        self.tags = list(tags)
+        self.index = BM25Index([self._document(tag) for tag in self.tags])
+
+    @staticmethod
+    def _document(tag) -> str:
+        if isinstance(tag, dict):
+            # Name counts twice: it is what the model actually returns
+            name = tag.get("name") or ""
+            return f"{name} {name} {tag.get('description') or ''}"
+        return str(tag)
+
+    def shortlist(self, subtitle: str, k: int = TAG_SHORTLIST_K) -> list:
+        """
+        Top-k tags for the subtitle, best first. Falls back to the full list
+        when k is 0 or nothing in the subtitle matches any tag.
+        """
+        if k <= 0 or k >= len(self.tags):
+            return self.tags
+
+        scores = self.index.scores(subtitle)
+        if not scores:
+            return self.tags
+
+        # Stable on ties, so equally scored tags keep taxonomy order
+        ranked = sorted(range(len(self.tags)), key=lambda i: -scores.get(i, 0.0))
+        return [self.tags[i] for i in ranked[:k]]
@@ -0,0 +1,98 @@
+"""
+Offline check of tag shortlisting against the full-list prompt.
+
+    python tag_shortlist_eval.py labelled.jsonl --source ../OPENAI_Integration/integration.py --k 10 20 30 50
+
+labelled.jsonl has one {"subtitle": ..., "tags": [...]} per line, where tags
+are what the model picked when it was shown the full list (e.g. collected
+from /info/generate responses). For each k this reports how many of those
+picks survive the shortlist (the model cannot choose a tag it is not shown)
+and how many prompt tokens the tag block costs.
+
+Stride_Backup/generate_info.py sends only the shortlist, so "saved" is
+what it takes off every prompt. integration.py keeps the full list in its
+cached prompt prefix (below the provider's 1,024-token caching minimum
+otherwise) and adds the shortlist after it as a hint, so there "tokens"
+is an uncached extra per request and "saved" does not apply; the full
+block is then billed at the cached-input rate.
+"""
+import argparse
+import ast
+import json
+
+from tag_shortlist import TagShortlister
+
+
+def load_allowed_tags(source_path: str) -> list:
+    """
+    Read the ALLOWED_TAGS literal from a route module without importing it
+    (importing would need API keys and clients).
+    """
+    with open(source_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "ALLOWED_TAGS" for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"No ALLOWED_TAGS literal in {source_path}")
+
+
+def tag_name(tag) -> str:
+    return tag["name"] if isinstance(tag, dict) else tag
+
+
+def count_tokens(text: str) -> int:
+    try:
+        import tiktoken
+
+        return len(tiktoken.encoding_for_model("gpt-4o").encode(text))
+    except Exception:
+        # Rough rule of thumb for English text
+        return len(text) // 4
+
+
+def render(tags: list) -> str:
+    # Same shapes the routes send: names joined, or the list of dicts
+    if tags and isinstance(tags[0], dict):
+        return str(tags)
+    return ", ".join(tags)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("labelled", help="JSONL of {subtitle, tags} from full-list runs")
+    parser.add_argument("--source", required=True, help="Route module defining ALLOWED_TAGS")
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 20, 30, 50])
+    args = parser.parse_args()
+
+    allowed = load_allowed_tags(args.source)
+    shortlister = TagShortlister(allowed)
+
+    with open(args.labelled, "r", encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+
+    full_tokens = count_tokens(render(allowed))
+    print(f"{len(examples)} examples, {len(allowed)} allowed tags, full tag block {full_tokens} tokens\n")
+    print(f"{'k':>4s} {'recall':>8s} {'all kept':>9s} {'tokens':>8s} {'saved':>7s}")
+
+    for k in args.k:
+        kept = 0
+        total = 0
+        all_kept = 0
+        tokens = 0
+        for example in examples:
+            candidates = shortlister.shortlist(example["subtitle"], k)
+            names = {tag_name(tag) for tag in candidates}
+            picked = set(example["tags"])
+            kept += len(picked & names)
+            total += len(picked)
+            all_kept += picked <= names
+            tokens += count_tokens(render(candidates))
+
+        avg_tokens = tokens / len(examples) if examples else 0
+        print(
+            f"{k:4d} {kept / total if total else 0:8.3f} "
+            f"{all_kept / len(examples) if examples else 0:9.3f} "
+            f"{avg_tokens:8.0f} {1 - avg_tokens / full_tokens:7.1%}"
+        )
@@ -0,0 +1,86 @@
+"""
+Per-request taxonomy cost: the old open + json.load + recursive extract_name
+on every call, against the compiled TaxonomyIndex.
+
+    python taxonomy_benchmark.py --nodes 100000 --requests 50
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from taxonomy_index import TaxonomyIndex
+
+
+def extract_name(nodes):
+    # The recursive leaf walk generate_info used before
+    results = []
+    for node in nodes:
+        children = node.get("children", [])
+        if isinstance(children, list) and len(children) == 0:
+            name = node.get("name")
+            description = node.get("description")
+            if name:
+                results.append({"name": name, "description": description})
+        elif isinstance(children, list):
+            results.extend(extract_name(children))
+    return results
+
+
+def build_taxonomy(n_nodes: int, branching: int = 10) -> dict:
+    """
+    Four-level tree with roughly n_nodes nodes in total.
+    """
+    counter = 0
+
+    def node(depth: int) -> dict:
+        nonlocal counter
+        counter += 1
+        name = f"Node {counter}"
+        if depth == 3:
+            return {"name": name, "description": f"Drill focus {counter}", "children": []}
+        width = branching if depth < 2 else max(1, n_nodes // (branching ** 2))
+        return {
+            "name": name,
+            "description": f"Category {counter}",
+            "children": [node(depth + 1) for _ in range(width)],
+        }
+
+    return {"data": [node(1) for _ in range(branching)]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    raw = build_taxonomy(args.nodes)
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(raw, f)
+
+    try:
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            with open(path, "r", encoding="utf-8") as f:
+                leaves = extract_name(json.load(f)["data"])
+        old_ms = (time.perf_counter() - started) / args.requests * 1000
+
+        started = time.perf_counter()
+        index = TaxonomyIndex(path)
+        compile_ms = (time.perf_counter() - started) * 1000
+        assert index.current().leaves == leaves
+
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            leaves = index.current().leaves
+        new_ms = (time.perf_counter() - started) / args.requests * 1000
+
+        print(f"{len(leaves)} leaves, {os.path.getsize(path) / 1e6:.1f} MB file")
+        print(f"  old per request:        {old_ms:10.3f} ms")
+        print(f"  index compile (once):   {compile_ms:10.3f} ms  (includes BM25 build)")
+        print(f"  index per request:      {new_ms:10.6f} ms")
+    finally:
+        os.remove(path)
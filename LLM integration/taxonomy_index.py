@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from tag_shortlist import TagShortlister
+
+
+class CompiledTaxonomy:
+    """
+    Everything the routes need from the taxonomy file, built in one pass.
+    """
+
+    def __init__(self, leaves: list, nodes_by_name: dict, parent_paths: dict):
+        self.leaves = leaves                  # [{"name", "description"}] in file order
+        self.nodes_by_name = nodes_by_name    # name -> {"name", "description", "is_leaf"}
+        self.parent_paths = parent_paths      # name -> ("Root", "Child", ...) above it
+        self.version = hashlib.sha256(
+            json.dumps(leaves, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+        self.shortlister = TagShortlister(leaves)
+
+
+def compile_taxonomy(roots: list) -> CompiledTaxonomy:
+    """
+    Iterative depth-first walk (no recursion limit on deep trees). A node is a
+    leaf when its "children" is an empty list or missing.
+    """
+    leaves = []
+    nodes_by_name = {}
+    parent_paths = {}
+
+    # Pushed in reverse so nodes pop in file order
+    stack = [(node, ()) for node in reversed(roots)]
+    while stack:
+        node, path = stack.pop()
+        name = node.get("name")
+        description = node.get("description")
+        children = node.get("children", [])
+        is_leaf = isinstance(children, list) and len(children) == 0
+
+        if name:
+            if name not in nodes_by_name:
+                nodes_by_name[name] = {"name": name, "description": description, "is_leaf": is_leaf}
+                parent_paths[name] = path
+            if is_leaf:
+                leaves.append({"name": name, "description": description})
+
+        if isinstance(children, list) and children:
+            child_path = path + (name,) if name else path
+            stack.extend((child, child_path) for child in reversed(children))
+
+    return CompiledTaxonomy(leaves, nodes_by_name, parent_paths)
+
+
+class TaxonomyIndex:
+    """
+    Loads the taxonomy JSON once and recompiles it when the file's mtime
+    changes. The mtime is checked at most every check_interval seconds, so
+    requests in between touch no files at all.
+    """
+
+    def __init__(self, path: str, fallback_leaves: list = None, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._fallback = fallback_leaves
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._compiled = None
+        self._refresh(force=True)
+
+    def _load(self) -> CompiledTaxonomy:
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return compile_taxonomy(raw["data"])
+
+    def _refresh(self, force: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+
+            if mtime is not None and mtime != self._mtime:
+                try:
+                    self._compiled = self._load()
+                    self._mtime = mtime
+                except (OSError, ValueError, KeyError):
+                    # Half-written file: keep serving the previous version
+                    # and try again on the next check
+                    if self._compiled is None and self._fallback is None:
+                        raise
+            if self._compiled is None and self._fallback is not None:
+                # No taxonomy file yet: use the built-in leaf list
+                self._compiled = CompiledTaxonomy(
+                    list(self._fallback),
+                    {leaf["name"]: {**leaf, "is_leaf": True} for leaf in self._fallback},
+                    {leaf["name"]: () for leaf in self._fallback},
+                )
+
+    def current(self) -> CompiledTaxonomy:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._refresh()
+        if self._compiled is None:
+            raise FileNotFoundError(f"Taxonomy file not found: {self.path}")
+        return self._compiled
@@ -1,13 +1,28 @@
 from dotenv import load_dotenv
 import os
-import json
+import sys
+from pathlib import Path
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
-from openai import OpenAI
 
+# Shared LLM helpers live in "LLM integration"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "LLM integration"))
+import json_repair
+import llm_client
+import llm_metrics
+import llm_router
+import rate_limiter
+import response_cache
+import single_flight
+import tag_shortlist
+
+# The pooled OpenAI client is shared with the other routers and closed
+# with the app
 router = APIRouter(
     prefix="/info",
-    tags=["Auto Generation"]
+    tags=["Auto Generation"],
+    lifespan=llm_client.lifespan,
 )
 
 class UserInput(BaseModel):
@@ -18,20 +33,70 @@ load_dotenv()
 
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
-    raise RuntimeError("GEMINI_API_KEY not found in environment")
-
-client = OpenAI(api_key=api_key)
-
-
-@router.post("/generate")
-def generate(text: UserInput):
-    try:
-        subtitle = text.subtitle.strip()
-        if not subtitle:
-            raise ValueError("Subtitle cannot be empty")
-
-        prompt = f"""
-        You are a senior instructional content writer and sports coaching analyst.
+    raise RuntimeError("OPENAI_API_KEY not found in environment")
+
+# Tags the model may choose from (each listed once)
+ALLOWED_TAGS = [
+    "Grip and Stance", "Footwork and Timing", "Shot Selection",
+    "Running Between Wickets", "Forward Defense", "Back Defense", "Leaving the Ball",
+    "Cover Drive", "Straight Drive", "Off Drive", "On Drive", "Cut Shot", "Square Cut",
+    "Late Cut", "Pull Shot", "Hook Shot", "Back Foot Punch", "Leg Glance", "Flick Shot",
+    "Sweep Shot", "Paddle Sweep", "Defensive Strokes", "Square Drive", "Glance",
+    "Flick", "Reverse Sweep", "Scoop Shot", "Switch Hit", "Helicopter Shot",
+    "Run-up and Delivery", "Line and Length", "Swing Bowling", "Seam Bowling",
+    "Slower Balls and Cutters", "Bouncers and Yorkers", "Off-Spin", "Leg-Spin",
+    "Left-Arm Spin", "Outswinger", "Inswinger", "Yorker", "Bouncer", "Slower Ball",
+    "Off Cutter", "Knuckle Ball", "Leg Cutter", "Off Break", "Leg Break", "Doosra",
+    "Googly", "Top Spinner", "Flipper", "Arm Ball", "Slider", "High Catching",
+    "Diving Catch", "Slip Catching", "Reflex Catching", "Sliding Stop", "Dive Stop",
+    "Pick Up and Throw", "Direct Hit", "Flat Throw", "Relay Throwing",
+    "Fielding Positions", "Slip Fielding", "Gully Fielding", "Point Fielding",
+    "Cover Fielding", "Mid-Wicket Fielding", "Boundary Fielding", "Keeper Stance",
+    "Keeper Footwork", "Taking Pace Bowling", "Taking Spin Bowling", "Diving Take",
+    "Leg Side Stumping", "Off Side Stumping", "Run Out Techniques",
+    "Wicketkeeper Stance", "Glovework", "Wicketkeeper Footwork", "Reading the Pitch",
+    "Weather & Overhead Conditions", "Batting First Strategy", "Bowling First Strategy",
+    "Pitch Evolution Understanding", "Opening Partnership Selection",
+    "Middle Order Construction", "Death Overs Specialists",
+    "Pinch Hitter / Promoted Batsman", "Nightwatchman Strategy",
+    "Batsman-Bowler Matchups", "Opening Bowling Strategy", "First Change Bowler",
+    "Introducing Spin Bowling", "Bowling Matchup Strategy", "Death Bowling Management",
+    "New Ball Strategy", "Over Rate Management", "Attacking Field Settings",
+    "Defensive Field Settings", "Powerplay Restrictions", "Field Settings for Pace",
+    "Field Settings for Spin", "Death Overs Field Placements",
+    "Umbrella Field (Catching Arc)", "On-Field Communication",
+    "Team Motivation & Morale", "Managing Different Personalities",
+    "Leading Under Pressure", "Strategic Timeouts", "Player Rotation & Workload",
+    "Post-Match Reflection", "Recognizing Momentum Shifts", "DRS & Review Strategy",
+    "Breaking Partnerships", "Run Rate Management", "Chasing Strategy",
+    "Declaration Timing", "Shoulder Mobility", "Arm Circles",
+    "Shoulder and Spine Mobility", "Shoulder Stretches", "Forearm Curls",
+    "Shadow Batting", "Batting Lunges", "Medicine Ball Slams", "Chest & Back",
+    "Squat Pulses", "Hip and Ankle Mobility", "Core Rotation Drills",
+    "Balance & Stability", "Abdominal Strength", "Thoracic Rotation",
+    "Twist Band Pulls", "Core Stability", "Dynamic Stretching",
+    "Groin and Inner Thigh Stretches", "Hip Mobility", "Weighted Bat Drives",
+    "Ball Reaction Drills", "Wrist Extenders", "High Intensity Training", "Wrist Icing",
+    "Match Scenario Visualization", "Skill Reinforcement Imagery", "Box Breathing",
+    "Pranayama", "Mindfulness Meditation", "Thought Labeling", "Concentration Grids",
+    "Mental Cue Words", "Positive Self-Talk", "Success Journaling",
+    "Simulated Pressure Drills", "Post-Game Reflection", "Balanced Whole Foods",
+    "Meal Timing", "Sleep-Supporting Nutrients", "Carb Loading", "Baseline Hydration",
+    "Electrolyte Drinks", "Quick Energy", "Protein Intake", "Anti-Inflammatory Foods",
+    "Creatine", "Caffeine", "Omega-3", "Urine Color Monitoring", "Hydration Checklists",
+]
+
+
+def render_tags(tags: list) -> str:
+    return ", ".join(tags) + "\n\n"
+
+
+# Everything that does not depend on the request, the full tag list
+# included. Built once at import and sent byte-for-byte identical first,
+# so provider-side prompt caching can reuse it (it has to reach the
+# provider's 1,024-token minimum to be cached at all); the candidate
+# tags and subtitle only go after it.
+PROMPT_PREFIX = """You are a senior instructional content writer and sports coaching analyst.
 
     Your task is to transform raw video subtitles into high-quality educational metadata suitable for a professional learning or training platform.
 
@@ -87,9 +152,6 @@ def generate(text: UserInput):
 
     - Do NOT invent, modify, or duplicate tags
 
-    ALLOWED TAGS:
-    Grip and Stance, Footwork and Timing, Shot Selection, Running Between Wickets, Forward Defense, Back Defense, Leaving the Ball, Cover Drive, Straight Drive, Off Drive, On Drive, Cut Shot, Square Cut, Late Cut, Pull Shot, Hook Shot, Back Foot Punch, Leg Glance, Flick Shot, Sweep Shot, Paddle Sweep, Defensive Strokes, Cover Drive, Straight Drive, On Drive, Square Drive, Pull Shot, Hook Shot, Cut Shot, Glance, Flick, Reverse Sweep, Scoop Shot, Switch Hit, Helicopter Shot, Reverse Sweep, Scoop Shot, Switch Hit, Helicopter Shot, Run-up and Delivery, Line and Length, Swing Bowling, Seam Bowling, Slower Balls and Cutters, Bouncers and Yorkers, Off-Spin, Leg-Spin, Left-Arm Spin, Outswinger, Inswinger, Yorker, Bouncer, Slower Ball, Off Cutter, Knuckle Ball, Leg Cutter, Off Break, Leg Break, Doosra, Googly, Top Spinner, Flipper, Arm Ball, Slider, High Catching, Diving Catch, Slip Catching, Reflex Catching, Sliding Stop, Dive Stop, Pick Up and Throw, Direct Hit, Flat Throw, Relay Throwing, Fielding Positions, Slip Fielding, Gully Fielding, Point Fielding, Cover Fielding, Mid-Wicket Fielding, Boundary Fielding, Keeper Stance, Keeper Footwork, Taking Pace Bowling, Taking Spin Bowling, Diving Take, Leg Side Stumping, Off Side Stumping, Run Out Techniques, Wicketkeeper Stance, Glovework, Wicketkeeper Footwork, Reading the Pitch, Weather & Overhead Conditions, Batting First Strategy, Bowling First Strategy, Pitch Evolution Understanding, Opening Partnership Selection, Middle Order Construction, Death Overs Specialists, Pinch Hitter / Promoted Batsman, Nightwatchman Strategy, Batsman-Bowler Matchups, Opening Bowling Strategy, First Change Bowler, Introducing Spin Bowling, Bowling Matchup Strategy, Death Bowling Management, New Ball Strategy, Over Rate Management, Attacking Field Settings, Defensive Field Settings, Powerplay Restrictions, Field Settings for Pace, Field Settings for Spin, Death Overs Field Placements, Umbrella Field (Catching Arc), On-Field Communication, Team Motivation & Morale, Managing Different Personalities, Leading Under Pressure, Strategic Timeouts, Player Rotation & Workload, Post-Match Reflection, Recognizing Momentum Shifts, DRS & Review Strategy, Breaking Partnerships, Run Rate Management, Chasing Strategy, Declaration Timing, Shoulder Mobility, Arm Circles, Shoulder and Spine Mobility, Shoulder Stretches, Forearm Curls, Shadow Batting, Batting Lunges, Medicine Ball Slams, Chest & Back, Squat Pulses, Hip and Ankle Mobility, Core Rotation Drills, Balance & Stability, Abdominal Strength, Thoracic Rotation, Twist Band Pulls, Core Stability, Dynamic Stretching, Groin and Inner Thigh Stretches, Hip Mobility, Weighted Bat Drives, Ball Reaction Drills, Wrist Extenders, High Intensity Training, Wrist Icing, Match Scenario Visualization, Skill Reinforcement Imagery, Box Breathing, Pranayama, Mindfulness Meditation, Thought Labeling, Concentration Grids, Mental Cue Words, Positive Self-Talk, Success Journaling, Simulated Pressure Drills, Post-Game Reflection, Balanced Whole Foods, Meal Timing, Sleep-Supporting Nutrients, Carb Loading, Baseline Hydration, Electrolyte Drinks, Quick Energy, Protein Intake, Anti-Inflammatory Foods, Creatine, Caffeine, Omega-3, Urine Color Monitoring, Hydration Checklists
-
     ────────────────────
     OUTPUT FORMAT
     ────────────────────
@@ -97,15 +159,34 @@ def generate(text: UserInput):
     Return EXACTLY this JSON structure and fill in the values.
     Do not add, remove, or repeat keys.
 
-    {{
+    {
     "content_title": "string",
     "description": "string",
     "skill": ["string"],
     "skill_level": "Beginner | Easy | Intermediate | Advanced | Expert",
     "tags": ["string"]
-    }}
+    }
 
-    ────────────────────
+    ALLOWED TAGS:
+""" + render_tags(ALLOWED_TAGS)
+
+# Ranks ALLOWED_TAGS against the subtitle; the best matches are sent as a
+# per-request hint after the cached prefix
+tag_shortlister = tag_shortlist.TagShortlister(ALLOWED_TAGS)
+
+
+def build_prompt(subtitle: str, tags: list = None) -> str:
+    """
+    tags: shortlisted candidates, sent as a hint after PROMPT_PREFIX; None
+    sends no hint.
+    """
+    hint = ""
+    if tags and len(tags) < len(ALLOWED_TAGS):
+        hint = (
+            "    CANDIDATE TAGS (the allowed tags most likely to fit this subtitle; "
+            "prefer these, but any ALLOWED TAG may be used):\n" + render_tags(tags)
+        )
+    return PROMPT_PREFIX + hint + f"""    ────────────────────
     SUBTITLE
     ────────────────────
     <<<
@@ -113,22 +194,80 @@ def generate(text: UserInput):
     >>>
         """
 
-        response = client.responses.create(
-            model="gpt-4o",
-            input=prompt,
+
+GENERATE_MODEL = "gpt-4o"
+PROMPT_VERSION = response_cache.prompt_version(
+    build_prompt("{subtitle}") + f"shortlist_k={tag_shortlist.TAG_SHORTLIST_K}"
+)
+
+generate_cache = response_cache.create_response_cache("integration-generate")
+repair_stats = json_repair.RepairStats()
+# Identical requests in flight at the same time share one LLM call
+generate_flight = single_flight.SingleFlight()
+
+# OpenAI first; Gemini hedges slow calls and takes over when OpenAI is failing
+llm = llm_router.create_llm_router(llm_client.get_openai_client, GENERATE_MODEL)
+
+metadata_schema = json_repair.MetadataSchema(
+    title_key="content_title",
+    skill_key="skill",
+    skill_levels=["Beginner", "Easy", "Intermediate", "Advanced", "Expert"],
+    allowed_tags=ALLOWED_TAGS,
+    tag_count=5,
+)
+
+
+async def generate_uncached(subtitle: str, cache_key: str) -> dict:
+    candidates = tag_shortlister.shortlist(subtitle)
+    prompt = build_prompt(subtitle, candidates)
+
+    completion = await llm.complete(prompt, route="/info/generate")
+    llm_metrics.log_prompt_usage(completion, "/info/generate")
+    # Models that contributed to the answer, hedge and failover included
+    models = {completion.model}
+
+    async def ask_for_fix(fix_prompt: str):
+        fix = await llm.complete(fix_prompt, route="/info/generate:repair")
+        llm_metrics.log_prompt_usage(fix, "/info/generate (repair)")
+        models.add(fix.model)
+        return fix
+
+    # Fixes what it can locally; re-asks only for fields still invalid
+    parsed_output, extra_in, extra_out = await json_repair.repair_output(
+        metadata_schema, subtitle, completion.text, ask_for_fix,
+        stats=repair_stats, candidate_tags=candidates,
+    )
+
+    # The key names GENERATE_MODEL; an answer from the fallback provider
+    # would otherwise be served as its own for the whole TTL
+    if models == {GENERATE_MODEL}:
+        await generate_cache.aset(
+            cache_key,
+            parsed_output,
+            input_tokens=completion.input_tokens + extra_in,
+            output_tokens=completion.output_tokens + extra_out,
         )
+    return parsed_output
+
 
-        if not response or not response.output_text:
-            raise RuntimeError("Empty response from Gemini")
+@router.post("/generate")
+async def generate(text: UserInput):
+    try:
+        subtitle = text.subtitle.strip()
+        if not subtitle:
+            raise ValueError("Subtitle cannot be empty")
 
-        llm_text = response.output_text.strip()
+        cache_key = response_cache.make_key(subtitle, "", GENERATE_MODEL, PROMPT_VERSION)
+        cached = await generate_cache.aget(cache_key)
+        if cached is not None:
+            return {
+                "response": cached["response"]
+            }
 
-        try:
-            parsed_output = json.loads(llm_text)
-        except json.JSONDecodeError as e:
-            raise ValueError(
-                f"Invalid JSON returned by LLM: {llm_text}"
-            ) from e
+        # Keyed like the cache, so normalised duplicates wait for one call
+        parsed_output = await generate_flight.do(
+            cache_key, lambda: generate_uncached(subtitle, cache_key)
+        )
 
         return {
             "response": parsed_output
@@ -141,9 +280,37 @@ def generate(text: UserInput):
             detail=str(ve)
         )
 
+    except rate_limiter.RateLimited as rl:
+        # Upstream budget exhausted: tell the client when to retry
+        raise HTTPException(
+            status_code=429,
+            detail=str(rl),
+            headers={"Retry-After": str(max(1, round(rl.retry_after)))},
+        )
+
     except Exception as e:
         # Catch EVERYTHING else so server never crashes
         raise HTTPException(
             status_code=500,
             detail=str(e)
         )
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    return {**generate_cache.stats(), "single_flight": generate_flight.stats()}
+
+
+@router.get("/repair/stats")
+def repair_stats_view():
+    return repair_stats.stats()
+
+
+@router.get("/llm/stats")
+def llm_stats():
+    return llm.stats()
+
+
+@router.get("/metrics")
+def metrics():
+    return Response(llm_metrics.metrics.render(), media_type=llm_metrics.CONTENT_TYPE)
@@ -0,0 +1,113 @@
+"""
+Load test: sync OpenAI client in Starlette's threadpool vs the shared
+AsyncOpenAI client, against a local mock of the Responses API.
+
+    python load_test.py --requests 400 --latency 2.0
+
+No API key or network access needed; the mock answers after --latency
+seconds, like a real multi-second completion.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import anyio
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from openai import AsyncOpenAI, OpenAI
+
+MOCK_PORT = 8765
+MOCK_URL = f"http://127.0.0.1:{MOCK_PORT}/v1"
+
+
+def build_mock(latency: float) -> FastAPI:
+    mock = FastAPI()
+
+    @mock.post("/v1/responses")
+    async def responses():
+        await asyncio.sleep(latency)
+        return {
+            "id": "resp_mock",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": "gpt-4o",
+            "status": "completed",
+            "output": [{
+                "id": "msg_mock",
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": "{}", "annotations": []}],
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {"input_tokens": 900, "output_tokens": 120, "total_tokens": 1020},
+        }
+
+    return mock
+
+
+def start_mock(latency: float):
+    config = uvicorn.Config(build_mock(latency), port=MOCK_PORT, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_sync_in_threadpool(n: int) -> float:
+    """
+    What a plain `def` route does: each call holds one of Starlette's 40
+    threadpool slots for its whole duration.
+    """
+    client = OpenAI(api_key="mock", base_url=MOCK_URL)
+
+    def call():
+        client.responses.create(model="gpt-4o", input="subtitle")
+
+    started = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for _ in range(n):
+            tg.start_soon(anyio.to_thread.run_sync, call)
+    return time.perf_counter() - started
+
+
+async def run_async(n: int) -> float:
+    client = AsyncOpenAI(
+        api_key="mock",
+        base_url=MOCK_URL,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=n, max_keepalive_connections=20)
+        ),
+    )
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client.responses.create(model="gpt-4o", input="subtitle") for _ in range(n)
+    ])
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = start_mock(args.latency)
+
+    sync_seconds = anyio.run(run_sync_in_threadpool, args.requests)
+    async_seconds = asyncio.run(run_async(args.requests))
+
+    print(f"{args.requests} requests, {args.latency:.1f}s upstream latency")
+    print(f"  sync client in threadpool: {sync_seconds:6.1f}s  {args.requests / sync_seconds:6.1f} req/s")
+    print(f"  shared AsyncOpenAI client: {async_seconds:6.1f}s  {args.requests / async_seconds:6.1f} req/s")
+
+    server.should_exit = True
@@ -0,0 +1,145 @@
+"""
+Per-token SSE frames vs coalesced flushing, over a real socket.
+
+    python sse_benchmark.py --tokens 400 --pause 3
+
+A simulated upstream emits tokens (~15 ms apart, with one long pause) and
+each mode writes its frames to one end of a socketpair, one send per frame
+as the server would. A reader on the other end records when text becomes
+visible. Reports writes (syscalls), bytes on the wire including chunked
+transfer-encoding overhead, how far text lags behind the upstream, and the
+longest silence a client sees.
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "LLM integration"))
+import sse_frames  # noqa: E402
+
+
+def token_schedule(n: int, mean_gap: float, pause_at: int, pause: float, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    words = ["the", "candidate", "built", "scalable", "services", "with", "Python", "and", "led", "teams"]
+    schedule = []
+    for i in range(n):
+        gap = rng.expovariate(1 / mean_gap) + (pause if i == pause_at else 0.0)
+        schedule.append((gap, rng.choice(words) + " "))
+    return schedule
+
+
+async def upstream(schedule: list, produced: list):
+    chars = 0
+    for gap, text in schedule:
+        await asyncio.sleep(gap)
+        chars += len(text)
+        produced.append((time.perf_counter(), chars))
+        yield text
+
+
+def reader(sock: socket.socket, visible: list, gaps: list):
+    buffer = b""
+    chars = 0
+    last = None
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            return
+        now = time.perf_counter()
+        if last is not None:
+            gaps.append(now - last)
+        last = now
+        buffer += data
+        while b"\n\n" in buffer:
+            frame, buffer = buffer.split(b"\n\n", 1)
+            for line in frame.split(b"\n"):
+                if line.startswith(b"data: "):
+                    chars += len(json.loads(line[6:])["text"])
+                    visible.append((now, chars))
+
+
+async def run_mode(schedule: list, flush_ms: float, flush_bytes: int, heartbeat: float) -> dict:
+    server, client = socket.socketpair()
+    visible, gaps, produced = [], [], []
+    thread = threading.Thread(target=reader, args=(client, visible, gaps), daemon=True)
+    thread.start()
+
+    writes = 0
+    wire_bytes = 0
+    heartbeats = 0
+    async for frame in sse_frames.coalesce(
+        upstream(schedule, produced), flush_ms=flush_ms, flush_bytes=flush_bytes, heartbeat_seconds=heartbeat
+    ):
+        payload = frame.encode("utf-8")
+        server.sendall(payload)
+        writes += 1
+        heartbeats += frame == sse_frames.HEARTBEAT
+        # Chunked transfer encoding: "<hex size>\r\n" + payload + "\r\n"
+        wire_bytes += len(payload) + len(f"{len(payload):x}") + 4
+
+    server.shutdown(socket.SHUT_WR)
+    thread.join()
+    server.close()
+    client.close()
+
+    # How long after the upstream produced each character it was visible
+    visible_times = [t for t, _ in visible]
+    visible_chars = [c for _, c in visible]
+    lags = []
+    for produced_at, chars in produced:
+        i = bisect.bisect_left(visible_chars, chars)
+        lags.append(visible_times[i] - produced_at)
+    lags.sort()
+    return {
+        "writes": writes,
+        "bytes": wire_bytes,
+        "heartbeats": heartbeats,
+        "lag_p50_ms": lags[len(lags) // 2] * 1000,
+        "lag_p99_ms": lags[int(len(lags) * 0.99)] * 1000,
+        "max_silence_s": max(gaps) if gaps else 0.0,
+    }
+
+
+def encoder_speed(frames: int = 20000) -> str:
+    payload = {"text": "scalable services with Python "}
+    started = time.perf_counter()
+    for _ in range(frames):
+        json.dumps(payload)
+    stdlib = (time.perf_counter() - started) / frames * 1e6
+    started = time.perf_counter()
+    for _ in range(frames):
+        sse_frames.dumps(payload)
+    used = (time.perf_counter() - started) / frames * 1e6
+    name = "orjson" if sse_frames.orjson is not None else "json (compact; orjson not installed)"
+    return f"json.dumps {stdlib:.2f} us/frame, sse_frames.dumps [{name}] {used:.2f} us/frame"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--gap-ms", type=float, default=15)
+    parser.add_argument("--pause", type=float, default=3.0, help="one upstream stall, in seconds")
+    parser.add_argument("--heartbeat", type=float, default=1.0)
+    args = parser.parse_args()
+
+    schedule = token_schedule(args.tokens, args.gap_ms / 1000, args.tokens // 2, args.pause)
+    modes = [("per-token", 0, 1), ("50 ms / 512 B", 50, 512), ("100 ms / 1 KiB", 100, 1024)]
+
+    print(f"{args.tokens} tokens ~{args.gap_ms:.0f} ms apart, one {args.pause:.1f} s stall, "
+          f"heartbeat every {args.heartbeat:.1f} s\n")
+    print(f"{'mode':<16s} {'writes':>7s} {'bytes':>8s} {'lag p50':>9s} {'lag p99':>9s} {'max silence':>12s} {'heartbeats':>11s}")
+    for label, flush_ms, flush_bytes in modes:
+        result = asyncio.run(run_mode(schedule, flush_ms, flush_bytes, args.heartbeat))
+        print(
+            f"{label:<16s} {result['writes']:7d} {result['bytes']:8d} "
+            f"{result['lag_p50_ms']:7.1f}ms {result['lag_p99_ms']:7.1f}ms "
+            f"{result['max_silence_s']:10.2f} s {result['heartbeats']:11d}"
+        )
+    print("\n" + encoder_speed())
@@ -0,0 +1,196 @@
+"""
+Inter-chunk latency of stream_summary under many concurrent streams,
+against a local mock of the streaming Chat Completions API.
+
+    python stream_benchmark.py --streams 1 25 100 --chunks 50 --interval 0.02
+
+Compares the old path (sync OpenAI stream iterated inside the async
+generator, blocking the loop on every read) with the AsyncOpenAI path, then
+checks that a client reconnecting with Last-Event-ID gets the rest of the
+same generation without a second upstream call, and that a client leaving
+for good aborts the upstream response. No API key or network access needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI, OpenAI
+
+MOCK_PORT = 8766
+MOCK_URL = f"http://127.0.0.1:{MOCK_PORT}/v1"
+
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+import streaming  # noqa: E402
+import llm_client  # noqa: E402  (on sys.path once streaming is imported)
+
+# Upstream streams the mock started, and how many were cut off by the client
+mock_stats = {"started": 0, "aborted": 0}
+
+
+def build_mock(chunks: int, interval: float) -> FastAPI:
+    mock = FastAPI()
+
+    def frame(payload: dict) -> str:
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @mock.post("/v1/chat/completions")
+    async def completions():
+        async def body():
+            mock_stats["started"] += 1
+            base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o"}
+            try:
+                for _ in range(chunks):
+                    await asyncio.sleep(interval)
+                    yield frame({**base, "choices": [{"index": 0, "delta": {"content": "word "}, "finish_reason": None}]})
+                yield frame({
+                    **base,
+                    "choices": [],
+                    "usage": {"prompt_tokens": 900, "completion_tokens": chunks, "total_tokens": 900 + chunks},
+                })
+                yield "data: [DONE]\n\n"
+            except (asyncio.CancelledError, GeneratorExit):
+                mock_stats["aborted"] += 1
+                raise
+
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    return mock
+
+
+def start_mock(chunks: int, interval: float):
+    config = uvicorn.Config(build_mock(chunks, interval), port=MOCK_PORT, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def sample_input() -> streaming.user_input:
+    return streaming.user_input(
+        ai_format="ai Concise",
+        resume_rendered=[{"name": "Sam", "skills": ["Python", "FastAPI"], "experience": "5 years backend"}],
+    )
+
+
+async def legacy_stream_summary(data, sync_client: OpenAI):
+    # The previous implementation: sync iteration inside an async generator
+    stream = sync_client.chat.completions.create(
+        model="gpt-4o",
+        stream=True,
+        stream_options={"include_usage": True},
+        messages=[{"role": "user", "content": streaming.generate_prompt(data)}],
+    )
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield streaming.sse("chunk", {"text": delta})
+
+
+async def consume(generator) -> list:
+    gaps = []
+    last = time.perf_counter()
+    async for event in generator:
+        if "event: chunk" in event:
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+    return gaps[1:]  # first gap is time to first token
+
+
+def summarise(gaps: list) -> str:
+    ordered = sorted(gaps)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+    return f"p50 {pick(50):7.1f} ms  p99 {pick(99):7.1f} ms  max {ordered[-1] * 1000:7.1f} ms"
+
+
+async def run(streams: int, legacy: bool) -> list:
+    data = sample_input()
+    if legacy:
+        sync_client = OpenAI(api_key="mock", base_url=MOCK_URL)
+        generators = [legacy_stream_summary(data, sync_client) for _ in range(streams)]
+    else:
+        llm_client._client = AsyncOpenAI(
+            api_key="mock",
+            base_url=MOCK_URL,
+            http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=streams + 10)),
+        )
+        generators = [streaming.stream_summary(data) for _ in range(streams)]
+
+    results = await asyncio.gather(*(consume(g) for g in generators))
+    if not legacy:
+        await streaming.shutdown()
+    return [gap for gaps in results for gap in gaps]
+
+
+async def read_chunks(generator, limit: int = None):
+    """Chunk texts and the last event id; stops after `limit` like a dropped client."""
+    texts, last_id = [], None
+    async for event in generator:
+        if "event: chunk" in event:
+            lines = event.split("\n")
+            last_id = lines[0][4:]
+            texts.append(json.loads(lines[2][6:])["text"])
+            if limit is not None and len(texts) == limit:
+                break
+    # What Starlette does when the browser goes away
+    await generator.aclose()
+    return texts, last_id
+
+
+async def resume_check(chunks: int):
+    llm_client._client = AsyncOpenAI(api_key="mock", base_url=MOCK_URL)
+    started_before = mock_stats["started"]
+
+    first, last_id = await read_chunks(streaming.stream_summary(sample_input()), limit=5)
+    await asyncio.sleep(0.2)
+    rest, _ = await read_chunks(streaming.stream_summary(sample_input(), last_event_id=last_id))
+    await streaming.shutdown()
+
+    text = "".join(first + rest)
+    started = mock_stats["started"] - started_before
+    print(f"\nReconnect after {len(first)} frames: {len(text.split())}/{chunks} words, {started} upstream call(s)")
+    assert started == 1 and text == "word " * chunks
+
+
+async def disconnect_check():
+    llm_client._client = AsyncOpenAI(api_key="mock", base_url=MOCK_URL)
+    streaming.event_log.grace = 0.2
+    aborted_before = mock_stats["aborted"]
+
+    texts, _ = await read_chunks(streaming.stream_summary(sample_input()), limit=5)
+    received = len(texts)
+    # The generation outlives the connection for the grace period
+    await asyncio.sleep(streaming.event_log.grace + 0.5)
+    await streaming.shutdown()
+
+    aborted = mock_stats["aborted"] - aborted_before
+    print(f"\nDisconnect after {received} chunks: upstream aborted {aborted}x, stats {streaming.summary_stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 25, 100])
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = start_mock(args.chunks, args.interval)
+    print(f"{args.chunks} chunks per stream, upstream sends one every {args.interval * 1000:.0f} ms\n")
+    for streams in args.streams:
+        legacy = asyncio.run(run(streams, legacy=True))
+        current = asyncio.run(run(streams, legacy=False))
+        print(f"{streams:4d} streams  sync client:  {summarise(legacy)}")
+        print(f"{'':4s}          async client: {summarise(current)}")
+
+    asyncio.run(resume_check(args.chunks))
+    asyncio.run(disconnect_check())
+    server.should_exit = True
@@ -1,15 +1,45 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
 from dotenv import load_dotenv
-import os, json, re
+import os, sys, re, asyncio, logging
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
 from typing import Any
 
+# Shared LLM helpers live in "LLM integration"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "LLM integration"))
+import llm_client
+import llm_metrics
+import rate_limiter
+import resume_compact
+import sse_frames
+import sse_resume
+from sse_frames import sse
+
 load_dotenv()
 
-router = APIRouter(tags=["API For Summary Generation"])
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+
+async def shutdown():
+    """
+    Stop generations still running, then close the shared client.
+    """
+    for task in list(producers):
+        task.cancel()
+    await llm_client.shutdown()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # FastAPI merges a router's lifespan into the app's that mounts it
+    await llm_client.startup()
+    yield
+    await shutdown()
+
+
+router = APIRouter(tags=["API For Summary Generation"], lifespan=lifespan)
 
 
 class user_input(BaseModel):
@@ -30,8 +60,10 @@ def get_format_instruction(ai_format: str) -> str:
     return format_map.get(ai_format, "Follow a standard professional summary format.")
 
 
-def generate_prompt(data: user_input) -> str:
-    resume = data.resume_rendered[0]
+def generate_prompt(data: user_input, resume: str = None) -> str:
+    # Labelled lines within RESUME_TOKEN_BUDGET, not the raw dict's repr
+    if resume is None:
+        resume = resume_compact.compact_resume(data.resume_rendered[0])
     format_instruction = get_format_instruction(data.ai_format)
     return f"""
 You are an expert resume writer and career branding specialist.
@@ -64,78 +96,268 @@ Return ONLY the plain summary text. No JSON, no code fences, no labels.
 """
 
 
-# ── Pricing constants (gpt-4o as of 2025) ─────────────────────────
-INPUT_PRICE_PER_TOKEN  = 2.5  / 1_000_000   # $2.50 / 1M tokens
-OUTPUT_PRICE_PER_TOKEN = 10.0 / 1_000_000   # $10.00 / 1M tokens
+# ── Pricing ───────────────────────────────────────────────────────
+SUMMARY_MODEL = "gpt-4o"
 
 
-def compute_price(input_tokens: int, output_tokens: int) -> float:
-    return round(
-        input_tokens  * INPUT_PRICE_PER_TOKEN +
-        output_tokens * OUTPUT_PRICE_PER_TOKEN,
-        8
-    )
+def compute_price(input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    # Same price table the /metrics cost counter uses
+    return round(llm_metrics.compute_cost(SUMMARY_MODEL, input_tokens, output_tokens, cached_tokens), 8)
 
 
-# ── SSE helper ────────────────────────────────────────────────────
-def sse(event: str, data: dict) -> str:
-    """Format a single SSE frame."""
-    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+# Upper bound on a summary; "ai Expand" (8-10 sentences) fits well within it
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "700"))
 
+# Finished and abandoned streams, for estimating what a disconnect saves
+summary_stats = {
+    "completed": 0,
+    "completed_output_tokens": 0,
+    "disconnected": 0,
+    "estimated_tokens_saved": 0,
+    "resumed": 0,
+    "resume_missed": 0,
+    # Resume block tokens: what the raw repr would have cost vs what was sent
+    "resume_tokens_repr": 0,
+    "resume_tokens_compact": 0,
+}
 
-# ── Core async generator ──────────────────────────────────────────
-async def stream_summary(data: user_input):
-    prompt = generate_prompt(data)
-
-    # ① Count prompt tokens before streaming (usage not in stream by default)
-    #    We enable stream_options to get usage in the final chunk.
-    stream = client.chat.completions.create(
-        model="gpt-4o",
-        stream=True,
-        stream_options={"include_usage": True},   # ← gives usage in last chunk
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a professional resume writer. Output plain text only."
-            },
-            {"role": "user", "content": prompt}
-        ]
+# Frames of in-flight and recently finished streams, replayed to clients
+# that reconnect with Last-Event-ID
+event_log = sse_resume.create_event_log()
+
+# Running generations; referenced here so they are not garbage collected
+producers = set()
+
+
+def record_disconnect(streamed_tokens: int):
+    """
+    Log what stopping early saved: a typical summary's length (mean of the
+    completed ones, half the cap before any finished) minus what was sent.
+    """
+    if summary_stats["completed"]:
+        expected = summary_stats["completed_output_tokens"] / summary_stats["completed"]
+    else:
+        expected = SUMMARY_MAX_TOKENS / 2
+    saved = max(0, round(expected - streamed_tokens))
+    summary_stats["disconnected"] += 1
+    summary_stats["estimated_tokens_saved"] += saved
+    logger.info(
+        "/generate/summary client gone after ~%d output tokens; upstream stream closed, "
+        "~%d tokens (~$%.5f) not generated",
+        streamed_tokens, saved, compute_price(0, saved),
     )
 
-    output_tokens = 0
-    input_tokens  = 0
 
-    for chunk in stream:
+# ── Core async generator ──────────────────────────────────────────
+async def upstream_deltas(stream, timer, usage: dict):
+    """
+    Text deltas from the OpenAI stream; usage from the last chunk is
+    written into `usage`.
+    """
+    async for chunk in stream:
         # ── text chunk ──────────────────────────────────────────
         delta = chunk.choices[0].delta.content if chunk.choices else None
         if delta:
-            yield sse("chunk", {"text": delta})
+            timer.first_token()
+            usage["streamed_chunks"] += 1     # ~one token per chunk
+            yield delta
 
         # ── usage arrives in the LAST chunk ────────────────────
         if chunk.usage:
-            input_tokens  = chunk.usage.prompt_tokens
-            output_tokens = chunk.usage.completion_tokens
+            usage["input_tokens"]  = chunk.usage.prompt_tokens
+            usage["output_tokens"] = chunk.usage.completion_tokens
+            details = getattr(chunk.usage, "prompt_tokens_details", None)
+            usage["cached_tokens"] = getattr(details, "cached_tokens", 0) or 0
+
+
+async def create_stream(prompt: str, estimated: int):
+    """
+    Open the upstream stream. Budget for the first attempt was taken by
+    open_summary; upstream 429s pause the shared scheduler and retry.
+    """
+    for attempt in range(rate_limiter.LLM_RATE_LIMIT_RETRIES + 1):
+        try:
+            # ① Count prompt tokens before streaming (usage not in stream by default)
+            #    We enable stream_options to get usage in the final chunk.
+            return await llm_client.get_openai_client().chat.completions.create(
+                model=SUMMARY_MODEL,
+                stream=True,
+                stream_options={"include_usage": True},   # ← gives usage in last chunk
+                max_tokens=SUMMARY_MAX_TOKENS,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a professional resume writer. Output plain text only."
+                    },
+                    {"role": "user", "content": prompt}
+                ]
+            )
+        except Exception as e:
+            if not rate_limiter.is_rate_limit_error(e):
+                raise
+            delay = rate_limiter.backoff_delay(attempt, rate_limiter.retry_after_seconds(e))
+            rate_limiter.scheduler.pause("openai", SUMMARY_MODEL, delay)
+            if attempt == rate_limiter.LLM_RATE_LIMIT_RETRIES:
+                raise rate_limiter.RateLimited("openai is rate limiting requests", delay) from e
+            logger.info("/generate/summary got 429, retrying in %.1fs", delay)
+            await rate_limiter.scheduler.acquire("openai", SUMMARY_MODEL, estimated)
+
+
+async def produce_summary(stream_id: str, prompt: str, estimated: int, resume_tokens: tuple):
+    """
+    Run the upstream generation for one stream and append its frames to
+    event_log. Clients attach and reattach through subscribe(); generation
+    only stops early once nobody has listened for the grace period.
+    """
+    timer = llm_metrics.metrics.timer("/generate/summary", "openai", SUMMARY_MODEL)
+    usage = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "streamed_chunks": 0}
+    stream = None
+    abandoned = False
+
+    try:
+        stream = await create_stream(prompt, estimated)
+
+        # Deltas are batched into fewer, larger frames (sse_frames.SSE_FLUSH_*).
+        # Heartbeats are not stored; subscribers send their own. aclosing
+        # cancels coalesce's pending read before stream.close() below.
+        async with aclosing(sse_frames.coalesce(upstream_deltas(stream, timer, usage))) as frames:
+            async for frame in frames:
+                if frame != sse_frames.HEARTBEAT:
+                    await event_log.append(stream_id, frame)
+                if not await event_log.has_listener(stream_id):
+                    abandoned = True
+                    break
+    except asyncio.CancelledError:
+        # Server shutting down
+        abandoned = True
+        raise
+    except rate_limiter.RateLimited as rl:
+        timer.fail("rate_limited")
+        await event_log.append(stream_id, sse("error", {
+            "detail": "Too many requests. Please retry later",
+            "retry_after": max(1, round(rl.retry_after)),
+        }))
+        await event_log.finish(stream_id)
+        return
+    except Exception:
+        logger.exception("/generate/summary stream %s failed", stream_id)
+        timer.fail()
+        await event_log.append(stream_id, sse("error", {"detail": "Summary generation failed"}))
+        await event_log.finish(stream_id)
+        return
+    finally:
+        if abandoned:
+            # Closing the response drops the upstream connection, which
+            # stops generation (and billing) for the rest of the summary
+            if stream is not None:
+                await stream.close()
+            timer.fail("cancelled")
+            record_disconnect(usage["streamed_chunks"])
+            await event_log.discard(stream_id)
+
+    if abandoned:
+        return
+
+    input_tokens = usage["input_tokens"]
+    output_tokens = usage["output_tokens"]
+    cached_tokens = usage["cached_tokens"]
+    timer.finish(input_tokens, output_tokens, cached_tokens)
+    rate_limiter.scheduler.settle("openai", SUMMARY_MODEL, estimated, input_tokens + output_tokens)
+    summary_stats["completed"] += 1
+    summary_stats["completed_output_tokens"] += output_tokens
+    logger.info(
+        "/generate/summary resume block %d tokens (repr would be %d), input %d tokens, TTFT %.3f s",
+        resume_tokens[1], resume_tokens[0], input_tokens, timer.ttft or 0.0,
+    )
 
     # ② Send metadata as a final typed SSE event
     total_tokens = input_tokens + output_tokens
-    total_price  = compute_price(input_tokens, output_tokens)
+    total_price  = compute_price(input_tokens, output_tokens, cached_tokens)
 
-    yield sse("metadata", {
+    await event_log.append(stream_id, sse("metadata", {
         "input_tokens":  input_tokens,
         "output_tokens": output_tokens,
         "total_tokens":  total_tokens,
         "total_price":   total_price,
-        "model":         "gpt-4o"
-    })
+        "model":         SUMMARY_MODEL
+    }))
+    await event_log.append(stream_id, sse("done", {}))
+    await event_log.finish(stream_id)
+
+
+async def open_summary(data: user_input, last_event_id: str = None) -> tuple:
+    """
+    (stream_id, after, reset) for a request. With the Last-Event-ID of a
+    stream that is still buffered, that stream from just after the id;
+    otherwise a new generation, once the shared scheduler has budget for it
+    (raises RateLimited). reset tells the client to drop partial text.
+    """
+    resume = sse_resume.parse_event_id(last_event_id)
+    if resume is not None and await event_log.exists(resume[0]):
+        summary_stats["resumed"] += 1
+        return resume[0], resume[1], False
+
+    block = resume_compact.compact_resume(data.resume_rendered[0])
+    prompt = generate_prompt(data, block)
+    estimated = rate_limiter.estimate_tokens(prompt, SUMMARY_MAX_TOKENS)
+    await rate_limiter.scheduler.acquire("openai", SUMMARY_MODEL, estimated)
+
+    resume_tokens = (
+        resume_compact.count_tokens(str(data.resume_rendered[0])),
+        resume_compact.count_tokens(block),
+    )
+    summary_stats["resume_tokens_repr"] += resume_tokens[0]
+    summary_stats["resume_tokens_compact"] += resume_tokens[1]
+
+    stream_id = sse_resume.new_stream_id()
+    await event_log.create(stream_id)
+    task = asyncio.create_task(produce_summary(stream_id, prompt, estimated, resume_tokens))
+    producers.add(task)
+    task.add_done_callback(producers.discard)
+
+    if last_event_id:
+        # Expired or unknown
+        summary_stats["resume_missed"] += 1
+    return stream_id, 0, bool(last_event_id)
+
 
-    yield sse("done", {})
+async def subscribe_summary(stream_id: str, after: int, reset: bool = False, request: Request = None):
+    """
+    SSE frames of a stream after `after`, each with an id: buffered ones
+    first, then live ones.
+    """
+    if reset:
+        yield sse("reset", {})
+
+    async for frame in sse_resume.subscribe(event_log, stream_id, after):
+        yield frame
+
+        # Servers that do not cancel the generator on disconnect
+        if request is not None and await request.is_disconnected():
+            break
+
+
+async def stream_summary(data: user_input, request: Request = None, last_event_id: str = None):
+    stream_id, after, reset = await open_summary(data, last_event_id)
+    async for frame in subscribe_summary(stream_id, after, reset, request):
+        yield frame
 
 
 # ── Route ─────────────────────────────────────────────────────────
 @router.post("/generate/summary")
-async def generate_summary(data: user_input):
+async def generate_summary(data: user_input, request: Request):
+    try:
+        stream_id, after, reset = await open_summary(data, request.headers.get("last-event-id"))
+    except rate_limiter.RateLimited as rl:
+        # No budget for a new generation: refuse before the stream opens
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": str(max(1, round(rl.retry_after)))},
+            content={"detail": str(rl)},
+        )
+
     return StreamingResponse(
-        stream_summary(data),
+        subscribe_summary(stream_id, after, reset, request),
         media_type="text/event-stream",
         headers={
             "Cache-Control":    "no-cache",
@@ -143,3 +365,13 @@ async def generate_summary(data: user_input):
             "Connection":       "keep-alive"
         }
     )
+
+
+@router.get("/generate/summary/stats")
+def summary_stream_stats():
+    return summary_stats
+
+
+@router.get("/metrics")
+def metrics():
+    return Response(llm_metrics.metrics.render(), media_type=llm_metrics.CONTENT_TYPE)